@@ -2,9 +2,15 @@
 
 Author: Heidi Ye
 Date: March 7 2019
+
+The per-pixel filters below are the reference versions; main() runs the
+vectorized ones from the imaging package, which give the same pixels. It builds
+them as lazy expressions, so an image is only computed when it is drawn.
+To process whole folders without a display, use "python -m imaging" instead.
 '''
 
 import image
+import imaging
 
 def clip(value, min=0, max=255):
     """ Clip the given value so that it it is an integer falling within the given range """
@@ -200,17 +206,21 @@ def main():
     win3 = image.ImageWin(minion_img.getWidth(), minion_img.getHeight())
     minion_img.draw(win3)
     
+    original_pixels = imaging.lazy(imaging.fromImage(original_img), IMAGE_FILE)
+    minion_pixels = imaging.lazy(imaging.fromImage(minion_img), MINION_FILE)
+
     # Create a transformed copy of the image and display it    
-    transformed_img = adjustBrightnessAndContrast(original_img,BRIGHTNESS,CONTRAST)
-    transformed_img = adjustGrey(original_img)
+    transformed_img = original_pixels.brightnessAndContrast(BRIGHTNESS,CONTRAST)
+    transformed_img = original_pixels.grey()
     win2 = image.ImageWin(transformed_img.getWidth(), transformed_img.getHeight())
     transformed_img.draw(win2)
     
     # Create a transformed copy of the image and display it    
-    green_screen_img = superposeGreenScreen(minion_img,original_img)
-    transformed_img = adjustGrey(original_img)
+    green_screen_img = minion_pixels.superposeGreenScreen(original_pixels)
+    transformed_img = original_pixels.grey()
     win4 = image.ImageWin(green_screen_img.getWidth(), green_screen_img.getHeight())
     green_screen_img.draw(win4)
     
     
-main()
\ No newline at end of file
+if __name__ == '__main__':
+    main()
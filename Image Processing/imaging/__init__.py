@@ -0,0 +1,25 @@
+"""
+Image processing library behind "Minion Image Processing.py"
+Filters work on ArrayImage objects (contiguous uint8 arrays); fromImage() and
+toImage() convert to and from the image module's types for drawing, and a
+PointPipeline runs any chain of point filters as one table-lookup pass;
+lazy() defers and fuses filters until their result is used, and a
+TiledExecutor spreads a filter over worker processes through shared memory.
+ChromaKey composites green-screen foregrounds with tolerant, soft-edged masks,
+processAnimation() streams animated GIFs and frame sequences through a chain,
+a ResultCache keeps chain results by content so they are computed once, and
+the neighborhood filters blur, sharpen and detect edges with separable and
+integral-image fast paths. autoLevels(), stretchPercentiles() and equalize()
+pick their point filter table from the image's histograms.
+"""
+
+from .array_image import ArrayImage, emptyImage, fromImage, toImage, fromPILImage, toPILImage, loadImage, saveImage
+from .filters import adjustContrast, adjustBrightness, adjustBrightnessAndContrast, adjustGrey, greenMask, superposeGreenScreen
+from .point_ops import PointPipeline
+from .lazy import LazyImage, lazy
+from .tiled import TiledExecutor
+from .chroma import ChromaKey
+from .frames import processAnimation, iterFrames, GifWriter
+from .cache import ResultCache
+from .neighborhood import boxBlur, gaussianBlur, sharpen, detectEdges, convolve
+from .histogram import autoLevels, stretchPercentiles, equalize, histograms
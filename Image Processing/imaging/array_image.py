@@ -0,0 +1,100 @@
+"""
+Array-backed images for the Minion Image Processing filters
+An ArrayImage keeps its pixels in one contiguous uint8 array of shape
+(height, width, 3), so a filter is a handful of NumPy operations over the whole
+image instead of a getPixel/setPixel call per pixel.
+"""
+
+import numpy as np
+
+class ArrayImage:
+    """ An RGB image stored as a contiguous uint8 array of shape (height, width, 3) """
+
+    def __init__(self, pixels):
+        pixels = np.asarray(pixels)
+        if pixels.ndim != 3 or pixels.shape[2] != 3:
+            raise ValueError("pixels must have shape (height, width, 3), got %r" % (pixels.shape,))
+        self.pixels = np.ascontiguousarray(pixels, dtype=np.uint8)
+
+    def getWidth(self):
+        """ Return the width of the image in pixels """
+        return self.pixels.shape[1]
+
+    def getHeight(self):
+        """ Return the height of the image in pixels """
+        return self.pixels.shape[0]
+
+    def getPixel(self, col, row):
+        """ Return the (red, green, blue) tuple of the pixel at col, row """
+        return tuple(int(value) for value in self.pixels[row, col])
+
+    def setPixel(self, col, row, color):
+        """ Set the pixel at col, row to a (red, green, blue) tuple or an image.Pixel """
+        if hasattr(color, 'getColorTuple'):
+            color = color.getColorTuple()
+        self.pixels[row, col] = color
+
+    def copy(self):
+        """ Return a copy of this image """
+        return ArrayImage(self.pixels.copy())
+
+    def __eq__(self, other):
+        return isinstance(other, ArrayImage) and np.array_equal(self.pixels, other.pixels)
+
+    def __repr__(self):
+        return "ArrayImage(%dx%d)" % (self.getWidth(), self.getHeight())
+
+def emptyImage(width, height):
+    """ Return a white width x height ArrayImage, like image.EmptyImage """
+    return ArrayImage(np.full((height, width, 3), 255, dtype=np.uint8))
+
+def fromPILImage(im):
+    """ Return an ArrayImage holding the pixels of a PIL image, converted to RGB """
+    return ArrayImage(np.asarray(im.convert('RGB')))
+
+def toPILImage(img):
+    """ Return a PIL RGB image holding the pixels of an ArrayImage """
+    from PIL import Image as PIL_Image
+    return PIL_Image.fromarray(img.pixels, 'RGB')
+
+def loadImage(path):
+    """ Return the first frame of an image file as an ArrayImage (needs Pillow, but no display) """
+    from PIL import Image as PIL_Image
+    with PIL_Image.open(path) as im:
+        return fromPILImage(im)
+
+def saveImage(img, path):
+    """ Save an ArrayImage to path, in the format given by its extension (needs Pillow) """
+    toPILImage(img).save(path)
+
+def fromImage(img):
+    """
+        Return an ArrayImage copy of an image.Image (or image.EmptyImage).
+        Reads the underlying PIL image in one go when the image module uses PIL,
+        otherwise falls back to getPixel.
+    """
+    im = getattr(img, 'im', None)
+    if hasattr(im, 'convert') and hasattr(im, 'getbands'):
+        return fromPILImage(im)
+    pixels = np.empty((img.getHeight(), img.getWidth(), 3), dtype=np.uint8)
+    for row in range(img.getHeight()):
+        for col in range(img.getWidth()):
+            p = img.getPixel(col, row)
+            pixels[row, col] = (p.getRed(), p.getGreen(), p.getBlue())
+    return ArrayImage(pixels)
+
+def toImage(img):
+    """ Return an image.EmptyImage holding the pixels of an ArrayImage, ready to draw in an ImageWin """
+    import image
+    result = image.EmptyImage(img.getWidth(), img.getHeight())
+    if image.pilAvailable:
+        result.im = toPILImage(img)
+        return result
+    for row in range(img.getHeight()):
+        for col in range(img.getWidth()):
+            red, green, blue = img.getPixel(col, row)
+            result.setPixel(col, row, image.Pixel(red, green, blue))
+    return result
+
+assert ArrayImage([[[1, 2, 3], [4, 5, 6]]]).getPixel(1, 0) == (4, 5, 6)
+assert emptyImage(2, 3).pixels.shape == (3, 2, 3)
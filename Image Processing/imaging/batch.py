@@ -0,0 +1,300 @@
+"""
+Headless batch processing for the imaging package
+Applies one filter chain to every image under a folder and writes the results
+to a mirrored folder tree; animated GIFs keep all their frames. Images are
+read, filtered and saved inside worker processes, with at most two images per
+worker in flight, so memory does not grow with the number of images. A manifest in the output folder records which
+input and chain produced each output, so unchanged images are skipped when the
+batch is run again. With a cache folder, results are also kept by content in a
+ResultCache, so images already filtered the same way under another name or in
+another batch are not computed again.
+"""
+
+import fnmatch
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from . import filters, histogram, neighborhood
+from .array_image import ArrayImage, loadImage, saveImage
+from .chroma import ChromaKey
+from .point_ops import PointPipeline
+
+IMAGE_PATTERNS = ('*.gif', '*.png', '*.jpg', '*.jpeg', '*.bmp', '*.ppm', '*.tif', '*.tiff')
+MANIFEST = '.imaging-batch.json' #written to the output folder
+
+#step name -> number of arguments; the green screen and chroma key arguments are the foreground image file
+STEPS = {'brightness': 1, 'contrast': 1, 'gamma': 1, 'invert': 0, 'grey': 0, 'greenscreen': 1, 'chromakey': 1,
+         'blur': 1, 'boxblur': 1, 'sharpen': 1, 'edges': 0, 'autolevels': 0, 'stretch': 1, 'equalize': 0}
+POINT_STEPS = ('brightness', 'contrast', 'gamma', 'invert', 'grey') #fused into one table-lookup pass
+HISTOGRAM_STEPS = ('autolevels', 'stretch', 'equalize') #tables computed from the image, fused with the point steps after them
+FOREGROUND_STEPS = ('greenscreen', 'chromakey')
+POSITIVE_STEPS = ('gamma', 'blur') #steps whose argument must be greater than 0
+RADIUS_STEPS = ('boxblur',) #steps whose argument must be a whole number >= 0
+
+def parseStep(text):
+    """ Return (name, args) for a chain step written as name or name:arg, e.g. brightness:100 or greenscreen:minion.gif """
+    name, _, arg = text.partition(':')
+    name = name.strip().lower()
+    if name not in STEPS:
+        raise ValueError("unknown step %r, expected one of %s" % (name, ", ".join(STEPS)))
+    if STEPS[name] == 0:
+        if arg:
+            raise ValueError("step %r takes no argument" % name)
+        return (name,)
+    if not arg:
+        raise ValueError("step %r needs an argument, e.g. %s:1.5" % (name, name))
+    if name in FOREGROUND_STEPS:
+        if not os.path.isfile(arg):
+            raise ValueError("step %r: foreground image %r not found" % (name, arg))
+        return (name, os.path.abspath(arg))
+    try:
+        value = float(arg)
+    except ValueError:
+        raise ValueError("step %r needs a number, got %r" % (name, arg)) from None
+    if name in POSITIVE_STEPS and not value > 0:
+        raise ValueError("step %r needs a number greater than 0, got %r" % (name, arg))
+    if name in RADIUS_STEPS and not (value >= 0 and value.is_integer()):
+        raise ValueError("step %r needs a whole number >= 0, got %r" % (name, arg))
+    if name == 'stretch' and not 0 <= value < 50:
+        raise ValueError("step %r needs a percentage from 0 to below 50, got %r" % (name, arg))
+    return (name, value)
+
+def parseChain(steps):
+    """ Return the chain of (name, args) steps from their command line texts """
+    return tuple(parseStep(step) for step in steps)
+
+assert parseChain(['brightness:100', 'Contrast:0.8', 'grey']) == (('brightness', 100.0), ('contrast', 0.8), ('grey',))
+assert parseStep('boxblur:2') == ('boxblur', 2.0)
+
+def chainKey(chain):
+    """ Return a text identifying the chain and the contents (size and time) of any file it reads """
+    parts = []
+    for step in chain:
+        if step[0] in FOREGROUND_STEPS:
+            info = os.stat(step[1])
+            parts.append("%s:%s:%d:%d" % (step[0], step[1], info.st_size, info.st_mtime_ns))
+        else:
+            parts.append(":".join(str(part) for part in step))
+    return "|".join(parts)
+
+workerForegrounds = {} #green-screen foregrounds loaded by this worker process, by path
+workerKeyed = {} #chroma-keyed foregrounds of this worker process, by path
+
+def foreground(path):
+    """ Return the green-screen foreground image at path, loaded once per process """
+    if path not in workerForegrounds:
+        workerForegrounds[path] = loadImage(path)
+    return workerForegrounds[path]
+
+def keyedForeground(path):
+    """ Return the foreground at path keyed with the default ChromaKey, keyed once per process """
+    if path not in workerKeyed:
+        workerKeyed[path] = ChromaKey().prepare(foreground(path))
+    return workerKeyed[path]
+
+def histogramTable(img, step):
+    """ Return the lookup table of a histogram step for img; stretch:P clips P percent at each end """
+    if step[0] == 'autolevels':
+        return histogram.stretchTable(img)
+    if step[0] == 'stretch':
+        return histogram.stretchTable(img, step[1], 100 - step[1])
+    return histogram.equalizeTable(img)
+
+def applyChain(img, chain):
+    """ Return img with the chain applied; consecutive point steps, and those after a histogram step, run as one fused pass """
+    pipeline = PointPipeline()
+    for step in chain + (('end',),):
+        if step[0] in ('brightness', 'contrast', 'gamma'):
+            pipeline = getattr(pipeline, step[0])(step[1])
+        elif step[0] == 'invert':
+            pipeline = pipeline.invert()
+        elif step[0] == 'grey':
+            pipeline = pipeline.greyscale()
+        elif step[0] in HISTOGRAM_STEPS:
+            if not pipeline.isIdentity():
+                img = pipeline.apply(img)
+            pipeline = PointPipeline().lut(histogramTable(img, step), step[0])
+        else:
+            if not pipeline.isIdentity():
+                img = pipeline.apply(img)
+            pipeline = PointPipeline()
+            if step[0] == 'greenscreen':
+                img = filters.superposeGreenScreen(foreground(step[1]), img)
+            elif step[0] == 'chromakey':
+                img = keyedForeground(step[1]).composite(img, fit='cover')
+            elif step[0] == 'blur':
+                img = neighborhood.gaussianBlur(img, step[1])
+            elif step[0] == 'boxblur':
+                img = neighborhood.boxBlur(img, step[1])
+            elif step[0] == 'sharpen':
+                img = neighborhood.sharpen(img, step[1])
+            elif step[0] == 'edges':
+                img = neighborhood.detectEdges(img)
+    return img
+
+workerCaches = {} #result caches of this worker process, by folder
+
+def resultCache(folder):
+    """ Return the ResultCache kept in folder, created once per process """
+    from .cache import ResultCache
+    if folder not in workerCaches:
+        workerCaches[folder] = ResultCache(folder)
+    return workerCaches[folder]
+
+def processImage(source, target, chain, cache=None):
+    """
+        Read source, apply the chain and save the result to target; animated GIFs are processed frame by frame.
+        cache is a ResultCache folder or None. Returns True if the result came from the cache
+    """
+    from . import frames
+    os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+    if target.lower().endswith('.gif') and frames.frameCount(source) > 1:
+        frames.processAnimation(source, target, chain)
+        return False
+    img = loadImage(source)
+    if cache is None:
+        img = applyChain(img, chain)
+        cached = False
+    else:
+        results = resultCache(cache)
+        hits = results.hits
+        img = results.apply(img, chain)
+        cached = results.hits > hits
+    saveImage(img, target)
+    return cached
+
+def discoverImages(root, patterns=IMAGE_PATTERNS, recursive=True, exclude=None):
+    """
+        Return the sorted paths of images under root whose file names match one of patterns, ignoring case,
+        leaving out the exclude folder
+    """
+    patterns = [pattern.lower() for pattern in patterns]
+    found = []
+    exclude = exclude and os.path.abspath(exclude)
+    for folder, subfolders, names in os.walk(root):
+        if not recursive:
+            subfolders[:] = []
+        subfolders[:] = sorted(name for name in subfolders if os.path.abspath(os.path.join(folder, name)) != exclude)
+        for name in names:
+            if any(fnmatch.fnmatchcase(name.lower(), pattern) for pattern in patterns):
+                found.append(os.path.join(folder, name))
+    return sorted(found)
+
+def targetPath(source, root, outputRoot, extension=None):
+    """ Return where the result for source goes: the same path relative to root, under outputRoot """
+    target = os.path.join(outputRoot, os.path.relpath(source, root))
+    if extension:
+        target = os.path.splitext(target)[0] + '.' + extension.lstrip('.')
+    return target
+
+def loadManifest(outputRoot):
+    """ Return {output path relative to outputRoot: [input size, input mtime, chain key]} from the last run """
+    try:
+        with open(os.path.join(outputRoot, MANIFEST)) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+def saveManifest(outputRoot, manifest):
+    """ Write the manifest, replacing the old one only once the new one is complete """
+    os.makedirs(outputRoot, exist_ok=True)
+    path = os.path.join(outputRoot, MANIFEST)
+    with open(path + '.tmp', 'w') as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+def sourceStamp(source, key):
+    """ Return the manifest entry describing source processed with the chain key """
+    info = os.stat(source)
+    return [info.st_size, info.st_mtime_ns, key]
+
+class BatchReport:
+    """ Counts of a batch run and its images/sec """
+
+    def __init__(self):
+        self.processed = 0
+        self.skipped = 0
+        self.cached = 0
+        self.failed = []
+        self.seconds = 0.0
+
+    def rate(self):
+        """ Return the processed images per second """
+        return self.processed / self.seconds if self.seconds > 0 else 0.0
+
+    def __str__(self):
+        return "Processed %d image(s) (%d from the cache), skipped %d unchanged, %d failed in %.2f s (%.1f images/s)" % (
+            self.processed, self.cached, self.skipped, len(self.failed), self.seconds, self.rate())
+
+def runBatch(root, outputRoot, chain, workers=1, patterns=IMAGE_PATTERNS, recursive=True, extension=None, force=False, progress=None,
+             cache=None, sources=None):
+    """
+        Apply chain to every image under root, writing results under outputRoot, and return a BatchReport.
+        progress, if given, is called with (source, target, error or None) as each image finishes;
+        cache is the folder of a ResultCache to reuse results from, or None;
+        sources, if given, lists the images under root to process instead of discovering them
+    """
+    key = chainKey(chain)
+    manifest = {} if force else loadManifest(outputRoot)
+    report = BatchReport()
+    start = time.perf_counter()
+    jobs = []
+    if sources is None:
+        sources = discoverImages(root, patterns, recursive, exclude=outputRoot)
+    for source in sources:
+        target = targetPath(source, root, outputRoot, extension)
+        name = os.path.relpath(target, outputRoot)
+        stamp = sourceStamp(source, key)
+        if manifest.get(name) == stamp and os.path.exists(target):
+            report.skipped += 1
+        else:
+            jobs.append((source, target, name, stamp))
+
+    def finished(job, error, cached=False):
+        source, target, name, stamp = job
+        if error is None:
+            report.processed += 1
+            report.cached += cached
+            manifest[name] = stamp
+        else:
+            report.failed.append((source, error))
+            manifest.pop(name, None)
+        if progress:
+            progress(source, target, error)
+
+    try:
+        if workers <= 1:
+            for job in jobs:
+                try:
+                    cached = processImage(job[0], job[1], chain, cache)
+                    finished(job, None, cached)
+                except Exception as error:
+                    finished(job, error)
+        else:
+            with ProcessPoolExecutor(workers) as executor:
+                pending = deque()
+                for job in jobs:
+                    pending.append((job, executor.submit(processImage, job[0], job[1], chain, cache)))
+                    while len(pending) >= 2 * workers:
+                        settle(pending.popleft(), finished)
+                while pending:
+                    settle(pending.popleft(), finished)
+    finally:
+        report.seconds = time.perf_counter() - start
+        saveManifest(outputRoot, manifest)
+    return report
+
+def settle(entry, finished):
+    """ Wait for one submitted image and pass its outcome to finished """
+    job, future = entry
+    try:
+        cached = future.result()
+        finished(job, None, cached)
+    except Exception as error:
+        finished(job, error)
+
+sample = ArrayImage([[[50, 0, 100], [100, 10, 100]], [[150, 20, 100], [200, 20, 100]]])
+assert applyChain(sample, parseChain(['autolevels', 'invert'])).getPixel(1, 0) == (170, 127, 155)
@@ -0,0 +1,125 @@
+"""
+Benchmarks for the imaging package
+Times the filters on a synthetic image of a given size with 1 to N worker
+processes of a TiledExecutor and prints the speedup over one core. The
+neighborhood filters are also timed against naiveConvolve(), a per-pixel
+reference, on a small image, with the largest difference between the two.
+
+Run as "python -m imaging.benchmark --size 4000 3000 --workers 1 2 4"
+"""
+
+import argparse
+import functools
+import os
+import time
+
+import numpy as np
+
+from . import filters, neighborhood
+from .array_image import ArrayImage
+from .point_ops import PointPipeline
+from .tiled import TILE_ROWS, TiledExecutor
+
+def syntheticImage(width, height, seed=0):
+    """ Return a random width x height ArrayImage """
+    rng = np.random.default_rng(seed)
+    return ArrayImage(rng.integers(0, 256, (height, width, 3), dtype=np.uint8))
+
+def greenScreenImage(width, height, seed=0):
+    """ Return a random width x height ArrayImage with a pure green backdrop around a rectangle in the middle """
+    img = syntheticImage(width, height, seed)
+    mask = np.ones((height, width), dtype=bool)
+    mask[height // 4:3 * height // 4, width // 4:3 * width // 4] = False
+    img.pixels[mask] = (0, 255, 0)
+    return img
+
+def timeRuns(run, repeats):
+    """ Return the best wall time of repeats calls of run """
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+def benchmarkCases(width, height):
+    """ Return (name, operation, images, halo) for each filter the benchmark times """
+    img = syntheticImage(width, height)
+    return [
+        ('brightness+contrast+grey', PointPipeline().brightnessAndContrast(100, 0.8).greyscale().apply, (img,), 0),
+        ('contrast', PointPipeline().contrast(0.8).apply, (img,), 0),
+        ('green screen', filters.superposeGreenScreen, (greenScreenImage(width, height, 1), img), 0),
+        ('box blur r=5', functools.partial(neighborhood.boxBlur, radius=5), (img,), 5),
+        ('gaussian blur sigma=2', functools.partial(neighborhood.gaussianBlur, sigma=2.0), (img,), neighborhood.halo('gaussianBlur', 2.0)),
+        ('sharpen', neighborhood.sharpen, (img,), neighborhood.halo('sharpen')),
+        ('edges', neighborhood.detectEdges, (img,), 1),
+    ]
+
+def scalingReport(width, height, workerCounts, repeats=3, tileRows=TILE_ROWS):
+    """ Return the timing lines of every benchmark case for each number of workers """
+    lines = ["{:<26}{:>8}{:>10}{:>9}{:>12}".format('Filter', 'Workers', 'Seconds', 'Speedup', 'MPixel/s')]
+    megapixels = width * height / 1e6
+    for name, operation, images, halo in benchmarkCases(width, height):
+        single = None
+        for workers in workerCounts:
+            with TiledExecutor(workers, tileRows) as executor:
+                executor.apply(operation, *images, halo=halo) #starts the workers before timing
+                seconds = timeRuns(lambda: executor.apply(operation, *images, halo=halo), repeats)
+            single = single or seconds
+            lines.append("{:<26}{:>8}{:>10.4f}{:>8.2f}x{:>12.1f}".format(name, workers, seconds, single / seconds, megapixels / seconds))
+    return lines
+
+def referenceCases():
+    """ Return (name, fast operation, kernel giving the same result with naiveConvolve()) for the neighborhood filters """
+    gaussian = np.outer(neighborhood.gaussianKernel(1.0), neighborhood.gaussianKernel(1.0))
+    identity = np.zeros_like(gaussian)
+    identity[identity.shape[0] // 2, identity.shape[1] // 2] = 1
+    laplacian = [[0, -1, 0], [-1, 4, -1], [0, -1, 0]]
+    return [
+        ('box blur r=2', functools.partial(neighborhood.boxBlur, radius=2), [[1 / 25.0] * 5] * 5),
+        ('gaussian blur sigma=1', functools.partial(neighborhood.gaussianBlur, sigma=1.0), gaussian.tolist()),
+        ('sharpen', neighborhood.sharpen, (2 * identity - gaussian).tolist()),
+        ('laplacian (not separable)', functools.partial(neighborhood.convolve, kernel=laplacian), laplacian),
+    ]
+
+def referenceReport(width, height, repeats=3):
+    """ Return the timing lines of the neighborhood filters against the naive per-pixel reference """
+    img = syntheticImage(width, height)
+    lines = ["{:<26}{:>10}{:>10}{:>9}{:>9}".format('Filter (vs naive)', 'Naive s', 'Fast s', 'Speedup', 'MaxDiff')]
+    for name, operation, kernel in referenceCases():
+        reference = neighborhood.naiveConvolve(img, kernel)
+        naive = timeRuns(lambda: neighborhood.naiveConvolve(img, kernel), 1)
+        fast = timeRuns(lambda: operation(img), repeats)
+        difference = np.abs(operation(img).pixels.astype(int) - reference.pixels).max()
+        lines.append("{:<26}{:>10.3f}{:>10.4f}{:>8.0f}x{:>9}".format(name, naive, fast, naive / fast, difference))
+    return lines
+
+def parseArguments(argv=None):
+    """ Return the command line options of the benchmark """
+    workers, counts = os.cpu_count() or 1, [1]
+    while counts[-1] * 2 <= workers:
+        counts.append(counts[-1] * 2)
+    parser = argparse.ArgumentParser(description="Times the imaging filters with 1 to N worker processes")
+    parser.add_argument('--size', type=int, nargs=2, default=[4000, 3000], metavar=('WIDTH', 'HEIGHT'), help="size of the synthetic image")
+    parser.add_argument('--workers', type=int, nargs='+', default=counts, help="worker counts to time (default: powers of two up to the CPU count)")
+    parser.add_argument('--tile-rows', type=int, default=TILE_ROWS, help="rows per tile")
+    parser.add_argument('--reference-size', type=int, nargs=2, default=[160, 120], metavar=('WIDTH', 'HEIGHT'),
+                        help="size of the image the neighborhood filters are compared with the naive reference on (0 0 to skip)")
+    parser.add_argument('--repeats', type=int, default=3, help="runs per measurement; the best one is reported")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """ Run the scaling benchmark and print its table """
+    args = parseArguments(argv)
+    width, height = args.size
+    print("Image %dx%d, %d CPU(s)" % (width, height, os.cpu_count() or 1))
+    for line in scalingReport(width, height, args.workers, args.repeats, args.tile_rows):
+        print(line, flush=True)
+    if min(args.reference_size) > 0:
+        print("\nImage %dx%d" % tuple(args.reference_size))
+        for line in referenceReport(args.reference_size[0], args.reference_size[1], args.repeats):
+            print(line, flush=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Content-addressed result cache for filter chains
+Results are keyed by a digest of the input pixels and the normalized chain, so
+the same image filtered with the same settings is computed once, whatever its
+file is called. Recent results are kept in memory up to a byte limit (least
+recently used first out); with a folder, every result is also saved there as a
+.npy file and found again by later runs. A chain is cached at its end and after
+each step that is not a point filter (green screen, chroma key, blur...), and is
+started from the longest prefix found in the cache, so chains that begin with
+the same steps as an earlier one only run the steps that differ.
+"""
+
+import hashlib
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from .array_image import ArrayImage
+from .batch import POINT_STEPS, applyChain, chainKey, parseStep
+from .chroma import pixelDigest
+
+MEMORY_BYTES = 256 * 1024 * 1024 #default size of the in-memory tier
+
+def normalizeChain(chain):
+    """ Return chain as a tuple of (name, args) steps, checked like parsed ones; steps may also be written as texts like 'brightness:100' """
+    return tuple(parseStep(step if isinstance(step, str) else ":".join(str(part) for part in step)) for step in chain)
+
+assert normalizeChain(['Contrast:0.8', ('brightness', 100), ('grey',)]) == (('contrast', 0.8), ('brightness', 100.0), ('grey',))
+
+def segmentEnds(chain):
+    """ Return the lengths of the prefixes of chain that are cached: after each step that is not a point filter, and the whole chain """
+    ends = [index + 1 for index, step in enumerate(chain) if step[0] not in POINT_STEPS]
+    if not ends or ends[-1] != len(chain):
+        ends.append(len(chain))
+    return ends
+
+assert segmentEnds((('grey',), ('greenscreen', 'a.gif'), ('invert',), ('edges',))) == [2, 4]
+
+class ResultCache:
+    """
+        Caches the results of filter chains, in memory up to memoryBytes and, if folder is given, on disk.
+        hits and misses count the chains apply() found whole or not; prefixHits the misses that started from a cached prefix;
+        memoryHits and diskHits the results read from each tier
+    """
+
+    def __init__(self, folder=None, memoryBytes=MEMORY_BYTES):
+        self.folder = folder
+        self.memoryBytes = memoryBytes
+        self.memory = OrderedDict()
+        self.usedBytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.prefixHits = 0
+        self.memoryHits = 0
+        self.diskHits = 0
+
+    def key(self, digest, chain):
+        """ Return the cache key of the image with pixel digest digest filtered by chain """
+        return hashlib.blake2b((digest + '|' + chainKey(chain)).encode(), digest_size=16).hexdigest()
+
+    def path(self, key):
+        """ Return the file the result with key is saved to in the disk tier """
+        return os.path.join(self.folder, key[:2], key + '.npy')
+
+    def get(self, key):
+        """ Return a copy of the cached result with key, or None """
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.memoryHits += 1
+            return ArrayImage(self.memory[key].copy())
+        if self.folder is not None:
+            try:
+                pixels = np.load(self.path(key))
+            except (OSError, ValueError):
+                return None
+            self.diskHits += 1
+            self.remember(key, pixels)
+            return ArrayImage(pixels.copy())
+        return None
+
+    def put(self, key, img):
+        """ Store a copy of img as the result with key in both tiers """
+        pixels = img.pixels.copy()
+        self.remember(key, pixels)
+        if self.folder is not None:
+            path = self.path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temporary = "%s.%d.tmp" % (path, os.getpid())
+            with open(temporary, 'wb') as file:
+                np.save(file, pixels)
+            os.replace(temporary, path)
+
+    def remember(self, key, pixels):
+        """ Keep pixels in the memory tier, dropping the least recently used results beyond the byte limit """
+        if pixels.nbytes > self.memoryBytes:
+            return
+        if key in self.memory:
+            self.usedBytes -= self.memory.pop(key).nbytes
+        self.memory[key] = pixels
+        self.usedBytes += pixels.nbytes
+        while self.usedBytes > self.memoryBytes:
+            self.usedBytes -= self.memory.popitem(last=False)[1].nbytes
+
+    def apply(self, img, chain):
+        """ Return img with the chain applied, starting from the longest cached prefix of the chain """
+        chain = normalizeChain(chain)
+        digest = pixelDigest(img)
+        start, result = 0, img
+        for end in range(len(chain), 0, -1):
+            cached = self.get(self.key(digest, chain[:end]))
+            if cached is not None:
+                start, result = end, cached
+                break
+        if start == len(chain):
+            self.hits += 1
+            return result
+        self.misses += 1
+        self.prefixHits += start > 0
+        for end in segmentEnds(chain):
+            if end > start:
+                result = applyChain(result, chain[start:end])
+                self.put(self.key(digest, chain[:end]), result)
+                start = end
+        return result
+
+    def clear(self):
+        """ Empty the memory tier and remove every result saved in the folder """
+        self.memory.clear()
+        self.usedBytes = 0
+        if self.folder is not None and os.path.isdir(self.folder):
+            for folder, subfolders, names in os.walk(self.folder):
+                for name in names:
+                    if name.endswith('.npy'):
+                        os.remove(os.path.join(folder, name))
+
+    def stats(self):
+        """ Return the lookup counts and the size of the memory tier """
+        return {'hits': self.hits, 'misses': self.misses, 'prefixHits': self.prefixHits, 'memoryHits': self.memoryHits, 'diskHits': self.diskHits,
+                'memoryResults': len(self.memory), 'memoryBytes': self.usedBytes}
+
+    def __str__(self):
+        lookups = self.hits + self.misses
+        return "Cache: %d hit(s), %d miss(es) of which %d from a cached prefix (%.0f%% hit rate), %d result(s) / %.1f MB in memory" % (
+            self.hits, self.misses, self.prefixHits, 100.0 * self.hits / lookups if lookups else 0.0, len(self.memory), self.usedBytes / 1e6)
+
+def checkResultCache():
+    """ Run chains through a cache holding a single tiny result and check the results and lookup counts; the objects stay local """
+    sample = ArrayImage([[[10, 200, 30], [250, 0, 128]]])
+    cache = ResultCache(memoryBytes=12)
+    assert cache.apply(sample, ['brightness:20', 'grey']) == applyChain(sample, (('brightness', 20.0), ('grey',)))
+    assert cache.apply(sample, [('brightness', 20), ('grey',)]).getPixel(1, 0) == (141, 141, 141)
+    assert cache.apply(sample, ['brightness:20', 'grey', 'invert']).getPixel(1, 0) == (114, 114, 114)
+    assert (cache.hits, cache.misses, cache.prefixHits, len(cache.memory)) == (1, 2, 1, 2)
+
+checkResultCache()
@@ -0,0 +1,167 @@
+"""
+Chroma-key compositing for the imaging package
+A ChromaKey turns a green-screen foreground into an alpha mask in one
+vectorized pass: 0 where the pixel is close to the key colour, 1 where it is
+far from it, with a soft ramp of softness units in between. Closeness is
+measured in YCbCr (distance in the Cb/Cr colour plane, so shading of the screen
+does not matter) or in HSV (hue difference), or with the exact test of
+isGreen(). Masks are cached by the foreground's pixels, so compositing one
+foreground over many backgrounds only costs the blend. Backgrounds of another
+size are cropped or scaled to the foreground first.
+"""
+
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+from . import filters
+from .array_image import ArrayImage, fromPILImage, toPILImage
+
+SPACES = ('ycbcr', 'hsv', 'exact')
+FITS = ('crop', 'scale', 'cover')
+MASK_CACHE_SIZE = 16 #masks kept per ChromaKey
+
+def ycbcr(pixels):
+    """ Return the Cb and Cr planes (ITU-R BT.601, full range) of an (..., 3) array of RGB values """
+    red, green, blue = (pixels[..., channel].astype(np.float32) for channel in range(3))
+    cb = 128 - 0.168736 * red - 0.331264 * green + 0.5 * blue
+    cr = 128 + 0.5 * red - 0.418688 * green - 0.081312 * blue
+    return cb, cr
+
+def hsv(pixels):
+    """ Return the hue (degrees), saturation and value (0..1) planes of an (..., 3) array of RGB values """
+    rgb = pixels.astype(np.float32) / 255
+    red, green, blue = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    value = rgb.max(axis=-1)
+    spread = value - rgb.min(axis=-1)
+    saturation = np.where(value > 0, spread / np.maximum(value, 1e-12), 0)
+    safe = np.maximum(spread, 1e-12)
+    hue = np.where(value == red, (green - blue) / safe % 6,
+                   np.where(value == green, (blue - red) / safe + 2, (red - green) / safe + 4)) * 60
+    return np.where(spread > 0, hue, 0), saturation, value
+
+assert [round(float(plane[0]), 3) for plane in hsv(np.array([[0, 255, 0]]))] == [120.0, 1.0, 1.0]
+
+def pixelDigest(img):
+    """ Return a digest of an image's size and pixels """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(img.pixels.shape).encode())
+    digest.update(img.pixels.tobytes())
+    return digest.hexdigest()
+
+def fitBackground(background, width, height, fit='crop'):
+    """
+        Return background as a width x height ArrayImage: 'crop' takes its top-left corner (like superposeGreenScreen),
+        'scale' resizes it, 'cover' scales it to cover the size keeping its aspect ratio and crops the centre
+    """
+    if fit not in FITS:
+        raise ValueError("fit must be one of %s, got %r" % (", ".join(FITS), fit))
+    pixels = background.pixels
+    if pixels.shape[:2] == (height, width):
+        return background
+    if fit == 'crop':
+        if pixels.shape[0] < height or pixels.shape[1] < width:
+            raise ValueError("background is %dx%d, smaller than the %dx%d foreground; use fit='scale' or 'cover'"
+                             % (pixels.shape[1], pixels.shape[0], width, height))
+        return ArrayImage(pixels[:height, :width])
+    if fit == 'scale':
+        return resize(background, width, height)
+    factor = max(width / pixels.shape[1], height / pixels.shape[0])
+    scaledWidth, scaledHeight = max(width, round(pixels.shape[1] * factor)), max(height, round(pixels.shape[0] * factor))
+    scaled = resize(background, scaledWidth, scaledHeight).pixels
+    top, left = (scaledHeight - height) // 2, (scaledWidth - width) // 2
+    return ArrayImage(scaled[top:top + height, left:left + width])
+
+def resize(img, width, height):
+    """ Return img resized to width x height with bilinear interpolation """
+    from PIL import Image as PIL_Image
+    return fromPILImage(toPILImage(img).resize((width, height), PIL_Image.BILINEAR))
+
+class KeyedForeground:
+    """ A foreground with its alpha mask computed, ready to be composited over any number of backgrounds """
+
+    def __init__(self, img, alpha):
+        self.img = img
+        self.alpha = alpha
+        self.weights = alpha[:, :, np.newaxis]
+
+    def composite(self, background, fit='crop'):
+        """ Return the foreground blended over background (fitted to the foreground's size) by the alpha mask """
+        background = fitBackground(background, self.img.getWidth(), self.img.getHeight(), fit)
+        if self.alpha.dtype == bool:
+            return ArrayImage(np.where(self.weights, self.img.pixels, background.pixels))
+        blended = self.img.pixels * self.weights + background.pixels * (1 - self.weights)
+        return ArrayImage(np.rint(blended).astype(np.uint8))
+
+class ChromaKey:
+    """
+        Computes alpha masks against a key colour.
+        tolerance: distance from the key still fully keyed out (Cb/Cr units for 'ycbcr', degrees of hue for 'hsv');
+        softness: width of the ramp from transparent to opaque beyond it (0 for a hard edge);
+        minSaturation, minValue: for 'hsv', pixels greyer or darker than these are always kept
+    """
+
+    def __init__(self, key=(0, 255, 0), space='ycbcr', tolerance=40.0, softness=20.0, minSaturation=0.25, minValue=0.15):
+        if space not in SPACES:
+            raise ValueError("space must be one of %s, got %r" % (", ".join(SPACES), space))
+        self.key = tuple(key)
+        self.space = space
+        self.tolerance = tolerance
+        self.softness = softness
+        self.minSaturation = minSaturation
+        self.minValue = minValue
+        self.masks = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def distance(self, pixels):
+        """ Return how far each pixel is from the key colour, in the units of the colour space """
+        key = np.array(self.key, dtype=np.uint8)
+        if self.space == 'ycbcr':
+            cb, cr = ycbcr(pixels)
+            keyCb, keyCr = ycbcr(key)
+            return np.hypot(cb - keyCb, cr - keyCr)
+        hue, saturation, value = hsv(pixels)
+        keyHue = hsv(key)[0]
+        difference = np.abs(hue - keyHue) % 360
+        difference = np.minimum(difference, 360 - difference)
+        return np.where((saturation < self.minSaturation) | (value < self.minValue), np.float32(360), difference)
+
+    def computeAlpha(self, img):
+        """ Return the alpha mask of img: a boolean array for 'exact' or a hard edge, otherwise float32 in 0..1 """
+        if self.space == 'exact':
+            return ~filters.greenMask(img)
+        distance = self.distance(img.pixels)
+        if self.softness <= 0:
+            return distance > self.tolerance
+        return np.clip((distance - self.tolerance) / self.softness, 0, 1).astype(np.float32)
+
+    def alpha(self, img):
+        """ Return the alpha mask of img, computed once per distinct foreground """
+        digest = pixelDigest(img)
+        if digest in self.masks:
+            self.hits += 1
+            self.masks.move_to_end(digest)
+            return self.masks[digest]
+        self.misses += 1
+        mask = self.computeAlpha(img)
+        self.masks[digest] = mask
+        if len(self.masks) > MASK_CACHE_SIZE:
+            self.masks.popitem(last=False)
+        return mask
+
+    def prepare(self, img):
+        """ Return img keyed against this key colour, for compositing over many backgrounds """
+        return KeyedForeground(img, self.alpha(img))
+
+    def composite(self, foreground, background, fit='crop'):
+        """ Return foreground composited over background, reusing the foreground's cached mask """
+        return self.prepare(foreground).composite(background, fit)
+
+sample = ArrayImage([[[0, 255, 0], [20, 230, 30]], [[200, 30, 40], [128, 128, 128]]])
+backdrop = ArrayImage(np.full((3, 3, 3), 7, dtype=np.uint8))
+assert ChromaKey(space='exact').composite(sample, backdrop) == filters.superposeGreenScreen(sample, backdrop)
+assert ChromaKey().composite(sample, backdrop).pixels[:, :, 0].tolist() == [[7, 7], [200, 128]]
+assert ChromaKey(space='hsv', tolerance=30).composite(sample, backdrop).getPixel(1, 1) == (128, 128, 128)
+assert fitBackground(backdrop, 2, 2).pixels.shape == (2, 2, 3)
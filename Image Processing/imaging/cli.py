@@ -0,0 +1,65 @@
+"""
+Command line entry point of the imaging package
+Run as "python -m imaging INPUT OUTPUT --chain brightness:100 contrast:0.8 grey";
+it needs Pillow but no display. INPUT and OUTPUT can also be numbered frame
+patterns such as frames/frame%04d.png, or OUTPUT a .gif, to process a clip.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from . import batch, frames
+
+def parseArguments(argv=None):
+    """ Return the command line options of the batch processor """
+    parser = argparse.ArgumentParser(description="Applies a filter chain to every image in a folder, without opening any window")
+    parser.add_argument('input', help="folder, single image or numbered frame pattern (e.g. frame%%04d.png) to process")
+    parser.add_argument('output', help="folder the processed images are written to, mirroring the input folders "
+                                       "(for a frame pattern input: a .gif or a frame pattern)")
+    parser.add_argument('--chain', nargs='+', required=True, metavar='STEP',
+                        help="steps in order: brightness:N contrast:F gamma:F invert grey greenscreen:FOREGROUND "
+                             "(composites FOREGROUND's pure green pixels over the image) chromakey:FOREGROUND "
+                             "(soft-edged green keying, the image is scaled to cover FOREGROUND) blur:SIGMA boxblur:RADIUS "
+                             "sharpen:AMOUNT edges autolevels stretch:PERCENT (clipped at each end) equalize")
+    parser.add_argument('--workers', type=int, default=1, help="number of worker processes (0 = one per CPU)")
+    parser.add_argument('--recursive', '-r', action='store_true', help="also process all subfolders")
+    parser.add_argument('--pattern', nargs='+', default=list(batch.IMAGE_PATTERNS), help="file name patterns of the images to process")
+    parser.add_argument('--format', metavar='EXT', help="save results with this extension (e.g. png) instead of the input's")
+    parser.add_argument('--force', action='store_true', help="process every image, even those whose output is up to date")
+    parser.add_argument('--cache', metavar='FOLDER', help="keep results by content in FOLDER and reuse them for identical images and chains")
+    parser.add_argument('--quiet', '-q', action='store_true', help="only print the summary")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """ Run the batch described by the command line and print how it went """
+    args = parseArguments(argv)
+    try:
+        chain = batch.parseChain(args.chain)
+    except ValueError as error:
+        print("Bad --chain:", error, file=sys.stderr)
+        return 2
+    if frames.isSequence(args.input):
+        start = time.perf_counter()
+        count = frames.processAnimation(args.input, args.output, chain)
+        seconds = time.perf_counter() - start
+        print("Processed %d frame(s) in %.2f s (%.1f frames/s)" % (count, seconds, count / seconds if seconds > 0 else 0))
+        return 0
+    root, sources = args.input, None
+    if os.path.isfile(root):
+        root, sources = os.path.dirname(root) or '.', [root]
+    elif not os.path.isdir(root):
+        print("Input", root, "not found", file=sys.stderr)
+        return 2
+
+    def progress(source, target, error):
+        if error is not None:
+            print("Failed", source + ":", error, file=sys.stderr)
+        elif not args.quiet:
+            print(source, "->", target)
+
+    report = batch.runBatch(root, args.output, chain, args.workers if args.workers > 0 else os.cpu_count(),
+                            args.pattern, args.recursive, args.format, args.force, progress, args.cache, sources)
+    print(report)
+    return 1 if report.failed else 0
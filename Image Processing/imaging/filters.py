@@ -0,0 +1,59 @@
+"""
+Vectorized versions of the Minion Image Processing filters
+Each filter takes and returns an ArrayImage and gives exactly the pixels of its
+per-pixel counterpart in "Minion Image Processing.py", including clip():
+values below 0 become 0, values above 255 become 255 and everything else is
+truncated with int(). The point filters are one-step PointPipelines; chain
+several steps on a PointPipeline to run them as a single pass.
+"""
+
+import numpy as np
+
+from .array_image import ArrayImage
+from .point_ops import PointPipeline
+
+def adjustContrast(img, contrast):
+    """
+        Return a copy of given img with the contrast adjusted by given factor.
+        @param  contrast values [0..1) reduce contrast;  values > 1 increase contrast
+    """
+    return PointPipeline().contrast(contrast).apply(img)
+
+def adjustBrightness(img, brightness):
+    """
+        Return a copy of given img with the brightness adjusted by given amount.
+        @param  brightness values < 0 darken;  values > 0 brighten
+    """
+    return PointPipeline().brightness(brightness).apply(img)
+
+def adjustBrightnessAndContrast(img, brightness, contrast):
+    """ Return a copy of given img with the contrast scaled by contrast, then the brightness shifted by brightness """
+    return PointPipeline().brightnessAndContrast(brightness, contrast).apply(img)
+
+def adjustGrey(img):
+    """ Return a copy of given img in greyscale: every channel becomes the mean of red, green and blue """
+    return PointPipeline().greyscale().apply(img)
+
+def greenMask(img):
+    """ Return a boolean (height, width) array that is True where isGreen() holds: red <= 1, blue <= 1 and green >= 254 """
+    pixels = img.pixels
+    return (pixels[:, :, 0] <= 1) & (pixels[:, :, 2] <= 1) & (pixels[:, :, 1] >= 254)
+
+def superposeGreenScreen(minion_img, original_img):
+    """
+        Superposes minion image onto the original image: green pixels of the minion image
+        are replaced by the original image's pixel at the same position
+    """
+    height, width = minion_img.getHeight(), minion_img.getWidth()
+    if original_img.getHeight() < height or original_img.getWidth() < width:
+        raise ValueError("background is %dx%d, smaller than the %dx%d foreground"
+                         % (original_img.getWidth(), original_img.getHeight(), width, height))
+    mask = greenMask(minion_img)[:, :, np.newaxis]
+    return ArrayImage(np.where(mask, original_img.pixels[:height, :width], minion_img.pixels))
+
+sample = ArrayImage([[[0, 255, 0], [10, 200, 250]], [[1, 254, 1], [255, 255, 255]]])
+assert adjustContrast(sample, 0.8).pixels.tolist() == [[[0, 204, 0], [8, 160, 200]], [[0, 203, 0], [204, 204, 204]]]
+assert adjustBrightness(sample, 100).getPixel(1, 0) == (110, 255, 255)
+assert adjustBrightnessAndContrast(sample, 100, 0.8).getPixel(1, 0) == (108, 255, 255)
+assert adjustGrey(sample).getPixel(1, 0) == (153, 153, 153)
+assert superposeGreenScreen(sample, adjustGrey(sample)).pixels.tolist() == [[[85, 85, 85], [10, 200, 250]], [[85, 85, 85], [255, 255, 255]]]
@@ -0,0 +1,114 @@
+"""
+Frame-by-frame processing of animated GIFs and numbered image sequences
+Frames are decoded, filtered and encoded one at a time by a chain of
+generators, so only a couple of frames are held in memory however long the clip
+is. Filter chains are the batch module's, which loads and keys green-screen
+foregrounds once and reuses them for every frame. GIFs are written by
+GifWriter, which encodes each frame as soon as it arrives; a sequence pattern
+such as "frames/frame%04d.png" reads or writes one numbered file per frame.
+"""
+
+import glob
+import os
+import re
+
+from .array_image import fromPILImage, saveImage, toPILImage
+from .batch import applyChain
+
+FRAME_MS = 100 #duration of frames that do not carry one, e.g. in a numbered sequence
+
+def isSequence(path):
+    """ Return True if path is a numbered sequence pattern such as frame%04d.png """
+    return re.search(r'%0?\d*d', path) is not None
+
+def sequencePaths(pattern):
+    """ Return the existing files of a numbered sequence pattern, in frame number order """
+    match = re.search(r'%0?\d*d', pattern)
+    prefix, suffix = pattern[:match.start()], pattern[match.end():]
+    numbered = []
+    for path in glob.glob(glob.escape(prefix) + '*' + glob.escape(suffix)):
+        number = path[len(prefix):len(path) - len(suffix)]
+        if number.isdigit():
+            numbered.append((int(number), path))
+    return [path for number, path in sorted(numbered)]
+
+def iterFrames(source):
+    """ Yield (ArrayImage, duration in ms) for each frame of an animated image file or a numbered sequence pattern """
+    from PIL import Image as PIL_Image
+    if isSequence(source):
+        for path in sequencePaths(source):
+            with PIL_Image.open(path) as im:
+                yield fromPILImage(im), im.info.get('duration') or FRAME_MS
+        return
+    with PIL_Image.open(source) as im:
+        for index in range(getattr(im, 'n_frames', 1)):
+            im.seek(index)
+            yield fromPILImage(im), im.info.get('duration') or FRAME_MS
+
+def processFrames(frames, chain):
+    """ Yield (filtered frame, duration) for each (frame, duration) of frames, applying the batch chain """
+    for img, duration in frames:
+        yield applyChain(img, chain), duration
+
+class GifWriter:
+    """
+        Writes an animated GIF one frame at a time, instead of collecting all frames first like Image.save(save_all=True).
+        Each frame gets its own 256 colour palette.
+    """
+
+    def __init__(self, path, loop=0):
+        self.file = open(path, 'wb')
+        self.loop = loop
+        self.frames = 0
+
+    def write(self, img, duration=FRAME_MS):
+        """ Quantize and append one frame shown for duration milliseconds """
+        from PIL import GifImagePlugin
+        frame = toPILImage(img).quantize(256)
+        if self.frames == 0:
+            header, used = GifImagePlugin.getheader(frame, info={'loop': self.loop})
+            self.file.write(b''.join(header))
+        for chunk in GifImagePlugin.getdata(frame, duration=duration, include_color_table=True):
+            self.file.write(chunk)
+        self.frames += 1
+
+    def close(self):
+        """ Write the GIF trailer and close the file """
+        if not self.file.closed:
+            self.file.write(b';')
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def writeFrames(frames, target):
+    """ Write (frame, duration) pairs to a .gif file or a numbered sequence pattern; returns the number of frames """
+    folder = os.path.dirname(target)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    count = 0
+    if isSequence(target):
+        for img, duration in frames:
+            saveImage(img, target % count)
+            count += 1
+        return count
+    if not target.lower().endswith('.gif'):
+        raise ValueError("frames can only be written to a .gif file or a numbered pattern like frame%%04d.png, not %r" % target)
+    with GifWriter(target) as writer:
+        for img, duration in frames:
+            writer.write(img, duration)
+            count += 1
+    return count
+
+def processAnimation(source, target, chain):
+    """ Stream every frame of source through the chain into target; returns the number of frames """
+    return writeFrames(processFrames(iterFrames(source), chain), target)
+
+def frameCount(path):
+    """ Return the number of frames of an image file """
+    from PIL import Image as PIL_Image
+    with PIL_Image.open(path) as im:
+        return getattr(im, 'n_frames', 1)
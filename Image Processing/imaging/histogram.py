@@ -0,0 +1,93 @@
+"""
+Histogram-driven point filters for the imaging package
+autoLevels() and stretchPercentiles() stretch each channel so its darkest and
+brightest values (or the given percentiles) become 0 and 255, and equalize()
+spreads the values so that every level is about equally used. Each needs two
+passes: one np.bincount over the pixels for the three channel histograms, then
+one table lookup. The tables are ordinary PointPipeline tables, so they fuse
+with any point filters around them. On large images the histograms are counted
+on every step-th row and column, which changes the tables very little.
+"""
+
+import math
+
+import numpy as np
+
+from .array_image import ArrayImage
+from .point_ops import PointPipeline, VALUES, channelTables
+
+MAX_SAMPLES = 1000000 #pixels counted for a histogram when no step is given
+CHUNK_ROWS = 256 #rows counted at a time, to bound the memory of the offset values
+OFFSETS = np.array([0, 256, 512], dtype=np.uint16) #channel c counts into bins 256 c .. 256 c + 255
+
+def sampleStep(img, maxSamples=MAX_SAMPLES):
+    """ Return the smallest row and column step that counts at most maxSamples pixels of img """
+    return max(1, math.ceil(math.sqrt(img.getWidth() * img.getHeight() / maxSamples)))
+
+def histograms(img, step=None):
+    """
+        Return the (3, 256) counts of each channel value of img, counting every step-th row and column.
+        step None picks one that counts at most MAX_SAMPLES pixels
+    """
+    step = step or sampleStep(img)
+    pixels = img.pixels[::step, ::step]
+    counts = np.zeros(768, dtype=np.int64)
+    for row in range(0, pixels.shape[0], CHUNK_ROWS):
+        bins = pixels[row:row + CHUNK_ROWS] + OFFSETS
+        counts += np.bincount(bins.ravel(), minlength=768)
+    return counts.reshape(3, 256)
+
+def percentileBounds(counts, low, high):
+    """ Return the values at the low and high percentiles of each histogram row, as two arrays """
+    cumulative = np.cumsum(counts, axis=-1)
+    total = cumulative[..., -1:]
+    lows = (cumulative > total * (low / 100.0)).argmax(axis=-1)
+    highs = (cumulative >= total * (high / 100.0)).argmax(axis=-1)
+    return lows, highs
+
+def levelsTable(lows, highs):
+    """ Return the (3, 256) table mapping each channel's low value to 0 and high value to 255, clipping outside them """
+    lows, highs = np.asarray(lows, dtype=np.float64)[:, np.newaxis], np.asarray(highs, dtype=np.float64)[:, np.newaxis]
+    spans = np.maximum(highs - lows, 1)
+    table = np.clip(np.rint((VALUES - lows) * 255 / spans), 0, 255)
+    return channelTables(np.where(highs > lows, table, VALUES).astype(np.uint8))
+
+def stretchTable(img, low=0.0, high=100.0, linked=False, step=None):
+    """
+        Return the table of stretchPercentiles(); linked uses the histogram of all channels together,
+        which stretches the image without shifting its colours
+    """
+    counts = histograms(img, step)
+    if linked:
+        counts = np.tile(counts.sum(axis=0), (3, 1))
+    return levelsTable(*percentileBounds(counts, low, high))
+
+def equalizeTable(img, step=None):
+    """ Return the (3, 256) table of equalize(): each channel's cumulative histogram scaled to 0..255 """
+    cumulative = np.cumsum(histograms(img, step), axis=1).astype(np.float64)
+    first = np.where(cumulative > 0, cumulative, np.inf).min(axis=1, keepdims=True)
+    spans = cumulative[:, -1:] - first
+    table = np.clip(np.rint((cumulative - first) * 255 / np.maximum(spans, 1)), 0, 255)
+    return channelTables(np.where(spans > 0, table, VALUES).astype(np.uint8))
+
+def stretchPercentiles(img, low=1.0, high=99.0, linked=False, step=None):
+    """
+        Return a copy of given img with each channel's low percentile mapped to 0 and high percentile to 255.
+        @param  low, high percentages of the values clipped at the dark and bright end
+    """
+    return PointPipeline().lut(stretchTable(img, low, high, linked, step), 'stretch').apply(img)
+
+def autoLevels(img, linked=False, step=None):
+    """ Return a copy of given img with each channel stretched so its darkest value becomes 0 and its brightest 255 """
+    return PointPipeline().lut(stretchTable(img, 0.0, 100.0, linked, step), 'autoLevels').apply(img)
+
+def equalize(img, step=None):
+    """ Return a copy of given img with the histogram of each channel equalized """
+    return PointPipeline().lut(equalizeTable(img, step), 'equalize').apply(img)
+
+sample = ArrayImage([[[50, 0, 100], [100, 10, 100]], [[150, 20, 100], [200, 20, 100]]])
+assert histograms(sample)[1, 20] == 2 and histograms(sample, 2).sum() == 3
+assert autoLevels(sample).pixels[:, :, 0].tolist() == [[0, 85], [170, 255]]
+assert autoLevels(sample, linked=True).getPixel(0, 0) == (64, 0, 128)
+assert stretchPercentiles(sample, 25, 75).getPixel(0, 1) == (255, 255, 100)
+assert equalize(sample).pixels[:, :, 1].tolist() == [[0, 85], [255, 255]]
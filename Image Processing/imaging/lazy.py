@@ -0,0 +1,220 @@
+"""
+Deferred image expressions for the imaging package
+A LazyImage records the filters applied to it instead of running them. Point
+filters chained on one another are fused into a single PointPipeline, and
+nothing is computed until the pixels are read, drawn or saved; a result is then
+kept on its node, so an expression used twice is computed once and one that is
+never used costs nothing. explain() shows the plan that would run.
+"""
+
+from . import filters, histogram, neighborhood
+from .array_image import ArrayImage, loadImage, saveImage, toImage
+from .point_ops import PointPipeline
+
+class LazyImage:
+    """ An image expression that is only computed when its pixels are needed """
+
+    def __init__(self, inputs=()):
+        self.inputs = tuple(inputs)
+        self.result = None
+
+    def compute(self):
+        """ Return the ArrayImage of this node from the results of its inputs """
+        raise NotImplementedError
+
+    def label(self):
+        """ Return a one-line description of this node for explain() """
+        raise NotImplementedError
+
+    def evaluate(self):
+        """ Return the ArrayImage of this expression, computing it (and any inputs not yet computed) the first time """
+        if self.result is None:
+            self.result = self.compute()
+        return self.result
+
+    def point(self, pipeline):
+        """ Return this expression followed by the point filters of pipeline, fused with a point node it follows """
+        if isinstance(self, PointNode) and self.result is None:
+            return PointNode(self.inputs[0], pipeline(self.pipeline))
+        return PointNode(self, pipeline(PointPipeline()))
+
+    def brightness(self, brightness):
+        """ Return this expression followed by adjustBrightness() """
+        return self.point(lambda pipeline: pipeline.brightness(brightness))
+
+    def contrast(self, contrast):
+        """ Return this expression followed by adjustContrast() """
+        return self.point(lambda pipeline: pipeline.contrast(contrast))
+
+    def brightnessAndContrast(self, brightness, contrast):
+        """ Return this expression followed by adjustBrightnessAndContrast() """
+        return self.point(lambda pipeline: pipeline.brightnessAndContrast(brightness, contrast))
+
+    def gamma(self, gamma):
+        """ Return this expression followed by a gamma correction """
+        return self.point(lambda pipeline: pipeline.gamma(gamma))
+
+    def invert(self):
+        """ Return this expression followed by a negative """
+        return self.point(lambda pipeline: pipeline.invert())
+
+    def grey(self):
+        """ Return this expression followed by adjustGrey() """
+        return self.point(lambda pipeline: pipeline.greyscale())
+
+    def lut(self, table, name='lut'):
+        """ Return this expression followed by a custom lookup table """
+        return self.point(lambda pipeline: pipeline.lut(table, name))
+
+    def boxBlur(self, radius, border='edge'):
+        """ Return this expression followed by neighborhood.boxBlur() """
+        return NeighborhoodNode(self, 'boxBlur', neighborhood.boxRadius(radius), border=border)
+
+    def gaussianBlur(self, sigma, border='edge'):
+        """ Return this expression followed by neighborhood.gaussianBlur() """
+        return NeighborhoodNode(self, 'gaussianBlur', sigma, border=border)
+
+    def sharpen(self, amount=1.0, sigma=1.0, border='edge'):
+        """ Return this expression followed by neighborhood.sharpen() """
+        return NeighborhoodNode(self, 'sharpen', amount, sigma, border=border)
+
+    def detectEdges(self, border='edge'):
+        """ Return this expression followed by neighborhood.detectEdges() """
+        return NeighborhoodNode(self, 'detectEdges', border=border)
+
+    def autoLevels(self, linked=False):
+        """ Return this expression followed by histogram.autoLevels() """
+        return HistogramNode(self, 'autoLevels', 0.0, 100.0, linked)
+
+    def stretchPercentiles(self, low=1.0, high=99.0, linked=False):
+        """ Return this expression followed by histogram.stretchPercentiles() """
+        return HistogramNode(self, 'stretch', low, high, linked)
+
+    def equalize(self):
+        """ Return this expression followed by histogram.equalize() """
+        return HistogramNode(self, 'equalize')
+
+    def superposeGreenScreen(self, background):
+        """ Return this expression (the green-screen foreground) superposed onto background """
+        return GreenScreenNode(self, background)
+
+    def getWidth(self):
+        """ Return the width of the result """
+        return self.evaluate().getWidth()
+
+    def getHeight(self):
+        """ Return the height of the result """
+        return self.evaluate().getHeight()
+
+    def getPixel(self, col, row):
+        """ Return the (red, green, blue) tuple of the result at col, row """
+        return self.evaluate().getPixel(col, row)
+
+    def draw(self, win):
+        """ Compute the result and draw it in an image.ImageWin """
+        toImage(self.evaluate()).draw(win)
+
+    def save(self, path):
+        """ Compute the result and save it to path """
+        saveImage(self.evaluate(), path)
+
+    def explain(self, indent=0):
+        """ Return the plan of this expression as indented text, one node per line, inputs below the node using them """
+        status = " (computed)" if self.result is not None else ""
+        lines = ["  " * indent + self.label() + status]
+        if self.result is None:
+            for node in self.inputs:
+                lines.append(node.explain(indent + 1))
+        return "\n".join(lines)
+
+class SourceNode(LazyImage):
+    """ An ArrayImage, or an image file that is only read when needed """
+
+    def __init__(self, source, name=None):
+        LazyImage.__init__(self)
+        self.source = source
+        self.name = name or (source if isinstance(source, str) else 'image')
+
+    def compute(self):
+        if isinstance(self.source, str):
+            return loadImage(self.source)
+        return self.source
+
+    def label(self):
+        return "source %s" % self.name
+
+class PointNode(LazyImage):
+    """ A fused chain of point filters, run as one table-lookup pass """
+
+    def __init__(self, node, pipeline):
+        LazyImage.__init__(self, (node,))
+        self.pipeline = pipeline
+
+    def compute(self):
+        img = self.inputs[0].evaluate()
+        if self.pipeline.isIdentity():
+            return img.copy()
+        return self.pipeline.apply(img)
+
+    def label(self):
+        return "point %s [1 pass, %d step(s) fused]" % (self.pipeline.describe(), len(self.pipeline.steps))
+
+class GreenScreenNode(LazyImage):
+    """ superposeGreenScreen() of a foreground and a background expression """
+
+    def __init__(self, foreground, background):
+        LazyImage.__init__(self, (foreground, background))
+
+    def compute(self):
+        return filters.superposeGreenScreen(self.inputs[0].evaluate(), self.inputs[1].evaluate())
+
+    def label(self):
+        return "green screen (foreground, background)"
+
+class NeighborhoodNode(LazyImage):
+    """ A blur, sharpen or edge filter of the neighborhood module """
+
+    def __init__(self, node, name, *args, border='edge'):
+        LazyImage.__init__(self, (node,))
+        self.name = name
+        self.args = args
+        self.border = border
+
+    def compute(self):
+        return getattr(neighborhood, self.name)(self.inputs[0].evaluate(), *self.args, border=self.border)
+
+    def label(self):
+        return "%s(%s) [%s border, halo %d]" % (self.name, ", ".join(str(arg) for arg in self.args), self.border,
+                                                neighborhood.halo(self.name, *self.args))
+
+class HistogramNode(LazyImage):
+    """ A lookup table computed from the histograms of its input, then applied to it """
+
+    def __init__(self, node, name, *args):
+        LazyImage.__init__(self, (node,))
+        self.name = name
+        self.args = args
+
+    def compute(self):
+        img = self.inputs[0].evaluate()
+        if self.name == 'equalize':
+            table = histogram.equalizeTable(img)
+        else:
+            table = histogram.stretchTable(img, *self.args)
+        return PointPipeline().lut(table, self.name).apply(img)
+
+    def label(self):
+        return "%s(%s) [histogram pass + 1 pass]" % (self.name, ", ".join(str(arg) for arg in self.args))
+
+def lazy(img, name=None):
+    """ Return a LazyImage for an ArrayImage, or for an image file path that is read on first use """
+    return SourceNode(img, name)
+
+source = lazy(ArrayImage([[[0, 255, 0], [10, 200, 250]]]), 'sample')
+discarded = source.brightnessAndContrast(100, 0.8)
+kept = source.brightness(10).contrast(0.5).grey()
+assert kept.explain() == "point brightness(10) -> contrast(0.5) -> grey [1 pass, 3 step(s) fused]\n  source sample"
+assert kept.getPixel(1, 0) == (80, 80, 80) and discarded.result is None
+assert kept.superposeGreenScreen(source.grey()).explain().splitlines()[1] == "  point brightness(10) -> contrast(0.5) -> grey [1 pass, 3 step(s) fused] (computed)"
+assert source.grey().boxBlur(1).explain().splitlines()[0] == "boxBlur(1) [edge border, halo 1]"
+assert source.equalize().getPixel(0, 0) == (0, 255, 0)
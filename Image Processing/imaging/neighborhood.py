@@ -0,0 +1,177 @@
+"""
+Neighborhood filters for the imaging package: blur, sharpen and edge detection
+Each output pixel is computed from the pixels around it, with the image
+extended past its borders by repeating the edge pixels ('edge'), mirroring
+('reflect') or black ('constant'). Results are rounded to the nearest integer
+and clipped to 0..255. Kernels that are the product of a column and a row
+kernel (Gaussian, Sobel, and any rank-1 kernel given to convolve()) run as two
+1D passes, k + k multiplications per pixel instead of k * k; boxBlur() reads
+four values of an integral image per pixel, whatever its radius. All filters
+are whole-array operations; halo() gives the rows and columns a TiledExecutor
+must read around each tile to run them tile by tile.
+"""
+
+import math
+
+import numpy as np
+
+from .array_image import ArrayImage
+
+BORDERS = {'edge': 'edge', 'reflect': 'reflect', 'constant': 'constant'} #border name -> numpy.pad mode
+SOBEL_SMOOTH = (1.0, 2.0, 1.0)
+SOBEL_DERIVATIVE = (1.0, 0.0, -1.0)
+
+def padded(pixels, rows, cols, border='edge'):
+    """ Return pixels extended by rows above and below and cols left and right, as border says """
+    if border not in BORDERS:
+        raise ValueError("border must be one of %s, got %r" % (", ".join(BORDERS), border))
+    return np.pad(pixels, ((rows, rows), (cols, cols), (0, 0)), mode=BORDERS[border])
+
+def toImage(values):
+    """ Return an ArrayImage of values rounded to the nearest integer and clipped to 0..255 """
+    return ArrayImage(np.clip(np.rint(values), 0, 255).astype(np.uint8))
+
+def gaussianKernel(sigma):
+    """ Return the normalized 1D Gaussian kernel of standard deviation sigma, reaching out 3 sigma """
+    if sigma <= 0:
+        raise ValueError("sigma must be positive, got %r" % sigma)
+    radius = max(1, math.ceil(3 * sigma))
+    weights = np.exp(-np.arange(-radius, radius + 1) ** 2 / (2.0 * sigma * sigma))
+    return weights / weights.sum()
+
+def convolve1d(data, kernel, axis):
+    """ Return the valid part of the convolution of the float array data with a 1D kernel along axis """
+    kernel = np.asarray(kernel, dtype=np.float32)[::-1]
+    length = data.shape[axis] - len(kernel) + 1
+    result = np.zeros(data.shape[:axis] + (length,) + data.shape[axis + 1:], dtype=np.float32)
+    term = np.empty_like(result)
+    window = [slice(None)] * data.ndim
+    for index, weight in enumerate(kernel):
+        if weight:
+            window[axis] = slice(index, index + length)
+            np.multiply(data[tuple(window)], weight, out=term)
+            result += term
+    return result
+
+def separableValues(pixels, columnKernel, rowKernel, border='edge'):
+    """ Return the float32 convolution of pixels with the outer product of columnKernel (vertical) and rowKernel (horizontal) """
+    data = padded(pixels, len(columnKernel) // 2, len(rowKernel) // 2, border).astype(np.float32)
+    return convolve1d(convolve1d(data, rowKernel, 1), columnKernel, 0)
+
+def separate(kernel):
+    """ Return (columnKernel, rowKernel) whose outer product is kernel, or None if kernel is not separable """
+    u, s, vt = np.linalg.svd(kernel)
+    if s[0] == 0 or (len(s) > 1 and s[1] > 1e-6 * s[0]):
+        return None
+    scale = math.sqrt(s[0])
+    return u[:, 0] * scale, vt[0] * scale
+
+def convolve(img, kernel, border='edge'):
+    """
+        Return a copy of given img convolved with kernel, a 2D list or array with odd sides.
+        Separable kernels are applied as two 1D passes
+    """
+    kernel = np.asarray(kernel, dtype=np.float64)
+    if kernel.ndim != 2 or kernel.shape[0] % 2 == 0 or kernel.shape[1] % 2 == 0:
+        raise ValueError("kernel must be 2D with odd sides, got shape %s" % (kernel.shape,))
+    parts = separate(kernel)
+    if parts is not None:
+        return toImage(separableValues(img.pixels, parts[0], parts[1], border))
+    rows, cols = kernel.shape[0] // 2, kernel.shape[1] // 2
+    data = padded(img.pixels, rows, cols, border).astype(np.float32)
+    height, width = img.pixels.shape[:2]
+    result = np.zeros(img.pixels.shape, dtype=np.float32)
+    for (row, col), weight in np.ndenumerate(kernel[::-1, ::-1]):
+        if weight:
+            result += np.float32(weight) * data[row:row + height, col:col + width]
+    return toImage(result)
+
+def boxRadius(radius):
+    """ Return radius as an int, raising ValueError unless it is a whole number >= 0 (2.0 is accepted, 2.5 is not) """
+    if not (radius >= 0 and float(radius).is_integer()):
+        raise ValueError("radius must be a whole number >= 0, got %r" % radius)
+    return int(radius)
+
+def boxBlur(img, radius, border='edge'):
+    """
+        Return a copy of given img where each pixel is the mean of the (2 radius + 1)^2 pixels around it.
+        Window sums come from an integral image, so the cost does not depend on radius
+    """
+    radius = boxRadius(radius)
+    if radius == 0:
+        return img.copy()
+    side = 2 * radius + 1
+    data = padded(img.pixels, radius, radius, border)
+    #uint32 sums wrap around on very large images, but every window sum fits, so the differences are still exact
+    integral = np.zeros((data.shape[0] + 1, data.shape[1] + 1, 3), dtype=np.uint32)
+    np.cumsum(np.cumsum(data, axis=0, dtype=np.uint32), axis=1, dtype=np.uint32, out=integral[1:, 1:])
+    sums = integral[side:, side:] - integral[:-side, side:] - integral[side:, :-side] + integral[:-side, :-side]
+    area = side * side
+    return ArrayImage(((sums + area // 2) // area).astype(np.uint8))
+
+def gaussianBlur(img, sigma, border='edge'):
+    """ Return a copy of given img blurred with a Gaussian of standard deviation sigma (in pixels) """
+    kernel = gaussianKernel(sigma)
+    return toImage(separableValues(img.pixels, kernel, kernel, border))
+
+def sharpen(img, amount=1.0, sigma=1.0, border='edge'):
+    """
+        Return a copy of given img sharpened by unsharp masking: the difference from a Gaussian blur is added amount times.
+        @param  amount 0 leaves the image unchanged; larger values sharpen more
+    """
+    kernel = gaussianKernel(sigma)
+    pixels = img.pixels.astype(np.float32)
+    blurred = separableValues(img.pixels, kernel, kernel, border)
+    return toImage(pixels + np.float32(amount) * (pixels - blurred))
+
+def detectEdges(img, border='edge'):
+    """ Return a greyscale copy of given img where each pixel is the Sobel gradient magnitude of the grey levels """
+    grey = img.pixels.astype(np.float32).mean(axis=2, keepdims=True)
+    gx = separableValues(grey, SOBEL_SMOOTH, SOBEL_DERIVATIVE, border)
+    gy = separableValues(grey, SOBEL_DERIVATIVE, SOBEL_SMOOTH, border)
+    return toImage(np.repeat(np.hypot(gx, gy), 3, axis=2))
+
+def halo(name, *args):
+    """ Return the rows and columns of context the filter called name needs around each output pixel """
+    if name == 'boxBlur':
+        return boxRadius(args[0])
+    if name in ('gaussianBlur', 'sharpen'):
+        sigma = args[0] if name == 'gaussianBlur' else (args[1] if len(args) > 1 else 1.0)
+        return len(gaussianKernel(sigma)) // 2
+    if name == 'detectEdges':
+        return 1
+    raise ValueError("unknown neighborhood filter %r" % name)
+
+def naiveConvolve(img, kernel, border='edge'):
+    """ Reference convolution with one Python loop iteration per pixel, channel and kernel weight, for tests and benchmarks """
+    rows, cols = len(kernel) // 2, len(kernel[0]) // 2
+    data = padded(img.pixels, rows, cols, border).tolist()
+    result = []
+    for row in range(img.getHeight()):
+        line = []
+        for col in range(img.getWidth()):
+            pixel = []
+            for channel in range(3):
+                total = 0.0
+                for kernelRow in range(len(kernel)):
+                    for kernelCol in range(len(kernel[0])):
+                        weight = kernel[len(kernel) - 1 - kernelRow][len(kernel[0]) - 1 - kernelCol]
+                        total += weight * data[row + kernelRow][col + kernelCol][channel]
+                pixel.append(min(255, max(0, round(total))))
+            line.append(pixel)
+        result.append(line)
+    return ArrayImage(result)
+
+sample = ArrayImage([[[0, 0, 0], [90, 90, 90], [0, 0, 0]], [[30, 60, 90], [0, 0, 0], [255, 255, 255]]])
+box = [[1 / 9.0] * 3] * 3
+assert boxBlur(sample, 1) == boxBlur(sample, 1.0) == naiveConvolve(sample, box) == convolve(sample, box)
+assert [boxRadius(radius) for radius in (0, 2, 2.0)] == [0, 2, 2] and halo('boxBlur', 3.0) == 3
+for radius in (2.5, -1, float('nan'), float('inf')):
+    try:
+        boxRadius(radius)
+    except ValueError:
+        continue
+    raise AssertionError("boxRadius accepted %r" % radius)
+assert convolve(sample, [[0, 0, 0], [0, 2, 0], [0, 0, -1]], 'constant').getPixel(2, 1) == (255, 255, 255)
+assert gaussianBlur(sample, 1.0, 'reflect').pixels.shape == (2, 3, 3) and sharpen(sample, 0) == sample
+assert detectEdges(ArrayImage([[[0] * 3, [0] * 3, [40] * 3, [40] * 3]])).getPixel(1, 0) == (160, 160, 160)
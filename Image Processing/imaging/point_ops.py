@@ -0,0 +1,145 @@
+"""
+Fused point operations for the imaging package
+Brightness, contrast, gamma and invert change every channel value on its own,
+so each one is a 256-entry lookup table, and a chain of them is the composition
+of its tables. Greyscale mixes the three channels, but its result is a single
+value per pixel, so everything after it is again a table of that value. Any
+chain therefore runs as one pass: per-channel table lookups, then (if the chain
+greys the image) the channel mix and one more lookup.
+"""
+
+import numpy as np
+
+from .array_image import ArrayImage
+
+VALUES = np.arange(256, dtype=np.float64)
+IDENTITY = np.tile(np.arange(256, dtype=np.uint8), (3, 1))
+
+def clip(values, min=0, max=255):
+    """ Clip an array of channel values to the given range and truncate them to uint8, like clip() does per value """
+    return np.clip(values, min, max).astype(np.uint8)
+
+assert clip(np.array([-5, 0.5, 127.9, 255.5, 300])).tolist() == [0, 0, 127, 255, 255]
+
+def channelTables(table):
+    """ Return a (3, 256) uint8 table from one table shared by all channels or one table per channel """
+    table = np.asarray(table)
+    if table.shape == (256,):
+        table = np.tile(table, (3, 1))
+    if table.shape != (3, 256):
+        raise ValueError("a lookup table must have shape (256,) or (3, 256), got %r" % (table.shape,))
+    return np.ascontiguousarray(table, dtype=np.uint8)
+
+def isShared(table):
+    """ Return True if all channels of a (3, 256) table are the same """
+    return np.array_equal(table[0], table[1]) and np.array_equal(table[0], table[2])
+
+def composeTables(first, then):
+    """ Return the (3, 256) table that applies first, then then, to each channel """
+    return np.take_along_axis(then, first.astype(np.intp), axis=1)
+
+assert composeTables(channelTables(255 - np.arange(256)), channelTables(255 - np.arange(256))).tolist() == IDENTITY.tolist()
+
+class PointPipeline:
+    """
+        A chain of point operations fused as it is built.
+        Each method returns a new pipeline with one more step; apply() runs the whole chain in one pass.
+    """
+
+    def __init__(self):
+        self.steps = ()
+        self.table = IDENTITY
+        self.grey = False
+        self.greyTable = IDENTITY
+
+    def withTable(self, table, step):
+        """ Return a copy of this pipeline followed by the (3, 256) lookup table, recorded as step """
+        result = PointPipeline()
+        result.steps = self.steps + (step,)
+        result.grey = self.grey
+        if self.grey:
+            result.table = self.table
+            result.greyTable = composeTables(self.greyTable, table)
+        else:
+            result.table = composeTables(self.table, table)
+        return result
+
+    def lut(self, table, name='lut'):
+        """ Return this pipeline followed by a custom lookup table, shared or per channel """
+        return self.withTable(channelTables(table), (name,))
+
+    def brightness(self, brightness):
+        """ Return this pipeline followed by adjustBrightness() """
+        return self.withTable(channelTables(clip(VALUES + brightness)), ('brightness', brightness))
+
+    def contrast(self, contrast):
+        """ Return this pipeline followed by adjustContrast() """
+        return self.withTable(channelTables(clip(VALUES * contrast)), ('contrast', contrast))
+
+    def brightnessAndContrast(self, brightness, contrast):
+        """ Return this pipeline followed by adjustBrightnessAndContrast() """
+        return self.withTable(channelTables(clip(VALUES * contrast + brightness)), ('brightnessAndContrast', brightness, contrast))
+
+    def gamma(self, gamma):
+        """ Return this pipeline followed by a gamma correction: values > 1 brighten the midtones, values < 1 darken them """
+        if gamma <= 0:
+            raise ValueError("gamma must be positive, got %r" % gamma)
+        return self.withTable(channelTables(clip(np.rint(255 * (VALUES / 255) ** (1 / gamma)))), ('gamma', gamma))
+
+    def invert(self):
+        """ Return this pipeline followed by a negative of every channel """
+        return self.withTable(channelTables(255 - np.arange(256)), ('invert',))
+
+    def greyscale(self):
+        """ Return this pipeline followed by adjustGrey(): every channel becomes the mean of red, green and blue """
+        result = PointPipeline()
+        result.steps = self.steps + (('grey',),)
+        result.table = self.table
+        result.grey = True
+        if self.grey:
+            # the channels already hold one grey value g, so greying again is a table of g too
+            mixed = self.greyTable.sum(axis=0, dtype=np.uint16) // 3
+            result.greyTable = channelTables(mixed.astype(np.uint8))
+        else:
+            result.greyTable = IDENTITY
+        return result
+
+    def isIdentity(self):
+        """ Return True if applying the pipeline leaves every image unchanged """
+        return not self.grey and np.array_equal(self.table, IDENTITY)
+
+    def apply(self, img):
+        """ Return a copy of img with the whole chain applied in one pass """
+        pixels = img.pixels
+        if not self.grey:
+            if isShared(self.table):
+                return ArrayImage(self.table[0][pixels])
+            result = np.empty_like(pixels)
+            for channel in range(3):
+                result[:, :, channel] = self.table[channel][pixels[:, :, channel]]
+            return ArrayImage(result)
+        total = self.table[0][pixels[:, :, 0]].astype(np.uint16)
+        total += self.table[1][pixels[:, :, 1]]
+        total += self.table[2][pixels[:, :, 2]]
+        grey = (total // 3).astype(np.uint8)
+        if isShared(self.greyTable):
+            return ArrayImage(np.repeat(self.greyTable[0][grey][:, :, np.newaxis], 3, axis=2))
+        result = np.empty_like(pixels)
+        for channel in range(3):
+            result[:, :, channel] = self.greyTable[channel][grey]
+        return ArrayImage(result)
+
+    def describe(self):
+        """ Return the steps of the chain as text, e.g. "brightness(100) -> grey" """
+        return " -> ".join("%s(%s)" % (step[0], ", ".join(repr(arg) for arg in step[1:])) if len(step) > 1 else step[0]
+                           for step in self.steps) or "identity"
+
+    def __repr__(self):
+        return "PointPipeline(%s)" % self.describe()
+
+sample = ArrayImage([[[0, 255, 0], [10, 200, 250]]])
+assert PointPipeline().contrast(0.8).brightness(100).apply(sample).getPixel(1, 0) == (108, 255, 255)
+assert PointPipeline().greyscale().invert().apply(sample).getPixel(1, 0) == (102, 102, 102)
+assert PointPipeline().greyscale().greyscale().apply(sample).getPixel(0, 0) == (85, 85, 85)
+assert PointPipeline().gamma(1).isIdentity()
+assert PointPipeline().brightness(100).greyscale().describe() == "brightness(100) -> grey"
@@ -0,0 +1,154 @@
+"""
+Multi-core tiled execution for the imaging filters
+The input images and a preallocated output are placed in shared memory once;
+worker processes attach to them by name, run the filter on one tile at a time
+and write the tile straight into the output, so no pixels are pickled. A tile
+can be read with a halo of extra rows and columns around it for filters that
+look at neighbouring pixels; only the tile itself is written back, which is
+how the neighborhood filters run tiled.
+"""
+
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from . import filters, neighborhood
+from .array_image import ArrayImage
+
+TILE_ROWS = 256 #rows per tile; tiles span the full width unless tileCols is given
+
+def tileGrid(height, width, tileRows=TILE_ROWS, tileCols=None):
+    """ Return the (row0, row1, col0, col1) bounds of the tiles covering a height x width image, row by row """
+    tileCols = tileCols or width
+    return [(row, min(row + tileRows, height), col, min(col + tileCols, width))
+            for row in range(0, height, tileRows) for col in range(0, width, tileCols)]
+
+assert tileGrid(5, 4, 2) == [(0, 2, 0, 4), (2, 4, 0, 4), (4, 5, 0, 4)]
+assert len(tileGrid(4, 4, 2, 2)) == 4
+
+def attachShared(name):
+    """
+        Return the SharedMemory block called name; the parent created it and unlinks it.
+        Forked and spawned workers share the parent's resource tracker, so attaching
+        (which registers the block again before Python 3.13) must not unregister it
+    """
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError: #Python < 3.13 has no track argument
+        return shared_memory.SharedMemory(name)
+
+workerBlocks = {} #shared memory blocks this worker process has attached to, by name
+
+def sharedArray(name, shape):
+    """ Return a uint8 array of the given shape backed by the shared block called name, attaching on first use """
+    if name not in workerBlocks:
+        workerBlocks[name] = attachShared(name)
+    return np.ndarray(shape, dtype=np.uint8, buffer=workerBlocks[name].buf)
+
+def releaseShared(names):
+    """ Closes this worker's views of shared blocks other than names """
+    for name in list(workerBlocks):
+        if name not in names:
+            workerBlocks.pop(name).close()
+
+def tileTask(operation, inputs, output, bounds, halo):
+    """
+        Runs operation on one tile of the shared inputs and writes the result into the shared output.
+        inputs and output are (block name, shape) pairs; bounds is (row0, row1, col0, col1)
+    """
+    releaseShared({name for name, shape in inputs} | {output[0]})
+    row0, row1, col0, col1 = bounds
+    height, width = output[1][:2]
+    top, left = max(row0 - halo, 0), max(col0 - halo, 0)
+    bottom, right = min(row1 + halo, height), min(col1 + halo, width)
+    tiles = [ArrayImage(sharedArray(name, shape)[top:bottom, left:right]) for name, shape in inputs]
+    result = operation(*tiles).pixels
+    sharedArray(*output)[row0:row1, col0:col1] = result[row0 - top:row1 - top, col0 - left:col1 - left]
+
+class TiledExecutor:
+    """
+        A pool of worker processes that runs filters tile by tile over shared memory.
+        Use it as a context manager, or call close() when done.
+    """
+
+    def __init__(self, workers=None, tileRows=TILE_ROWS, tileCols=None):
+        self.workers = workers or os.cpu_count()
+        self.tileRows = tileRows
+        self.tileCols = tileCols
+        self.pool = ProcessPoolExecutor(self.workers) if self.workers > 1 else None
+
+    def apply(self, operation, *images, halo=0):
+        """
+            Return operation(*images) computed tile by tile. operation must be picklable, take and return ArrayImages,
+            and give each output pixel from the input pixels within halo rows and columns of it;
+            all images must have the size of the first one
+        """
+        shape = images[0].pixels.shape
+        for img in images[1:]:
+            if img.pixels.shape != shape:
+                raise ValueError("all images must be %dx%d" % (shape[1], shape[0]))
+        if self.pool is None:
+            return operation(*images)
+        blocks = []
+        try:
+            inputs = []
+            for img in images:
+                block = shared_memory.SharedMemory(create=True, size=img.pixels.nbytes)
+                blocks.append(block)
+                np.ndarray(shape, dtype=np.uint8, buffer=block.buf)[:] = img.pixels
+                inputs.append((block.name, shape))
+            block = shared_memory.SharedMemory(create=True, size=images[0].pixels.nbytes)
+            blocks.append(block)
+            output = (block.name, shape)
+            tasks = [self.pool.submit(tileTask, operation, inputs, output, bounds, halo)
+                     for bounds in tileGrid(shape[0], shape[1], self.tileRows, self.tileCols)]
+            for task in tasks:
+                task.result()
+            return ArrayImage(np.ndarray(shape, dtype=np.uint8, buffer=block.buf).copy())
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    def superposeGreenScreen(self, minion_img, original_img):
+        """ Tiled superposeGreenScreen(); the background is cropped to the foreground's size first """
+        height, width = minion_img.getHeight(), minion_img.getWidth()
+        if original_img.getHeight() < height or original_img.getWidth() < width:
+            return filters.superposeGreenScreen(minion_img, original_img) #raises the size error
+        background = ArrayImage(original_img.pixels[:height, :width])
+        return self.apply(filters.superposeGreenScreen, minion_img, background)
+
+    def boxBlur(self, img, radius, border='edge'):
+        """ Tiled neighborhood.boxBlur() """
+        radius = neighborhood.boxRadius(radius)
+        return self.apply(functools.partial(neighborhood.boxBlur, radius=radius, border=border), img,
+                          halo=neighborhood.halo('boxBlur', radius))
+
+    def gaussianBlur(self, img, sigma, border='edge'):
+        """ Tiled neighborhood.gaussianBlur() """
+        return self.apply(functools.partial(neighborhood.gaussianBlur, sigma=sigma, border=border), img,
+                          halo=neighborhood.halo('gaussianBlur', sigma))
+
+    def sharpen(self, img, amount=1.0, sigma=1.0, border='edge'):
+        """ Tiled neighborhood.sharpen() """
+        return self.apply(functools.partial(neighborhood.sharpen, amount=amount, sigma=sigma, border=border), img,
+                          halo=neighborhood.halo('sharpen', amount, sigma))
+
+    def detectEdges(self, img, border='edge'):
+        """ Tiled neighborhood.detectEdges() """
+        return self.apply(functools.partial(neighborhood.detectEdges, border=border), img, halo=neighborhood.halo('detectEdges'))
+
+    def close(self):
+        """ Shuts the worker processes down """
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,9 @@
+'''
+Plagiarism Detector library
+Importing the package does no file I/O. Build a Detector with explicit paths and
+settings, then call analyze(), query() or the other analysis methods on it;
+the command line lives in plagiarism.cli.
+'''
+
+from .detector import Detector, numOfPlagiarizedFiles, ALL_PAIRS, LSH_PAIRS, THRESHOLD_PAIRS, PLAGIARISM_THERSHOLD
+from .shingles import shingleLine, shingleFile, shingleFileWidths, similarityIndex, computeFileSimilarity, similarityStats
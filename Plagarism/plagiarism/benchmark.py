@@ -0,0 +1,281 @@
+'''
+Benchmarks for the Plagiarism Detector
+Generates synthetic corpora of a given size, document length and plagiarism rate,
+where a plagiarized document is an exact copy, a paraphrase (words replaced and
+swapped) or a partial overlap (a passage of its source spliced into a new text),
+then times each analysis mode on them and records throughput and peak memory.
+The approximate modes are scored against the exact Jaccard run of the same corpus.
+
+Run as "python -m plagiarism.benchmark --scales 100 1000 10000"
+'''
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate
+
+try:
+    import resource
+except ImportError: #not available on Windows, where peak memory falls back to tracemalloc
+    resource = None
+
+from .detector import ALL_PAIRS, LSH_PAIRS, THRESHOLD_PAIRS, Detector
+from .profiling import Profile
+
+VOCABULARY_SIZE = 5000 #distinct words of the synthetic language
+LINE_WORDS = 12 #words per line of a generated document
+PARAPHRASE_REPLACE = 0.08 #share of words a paraphrase replaces
+PARAPHRASE_SWAP = 0.02 #share of adjacent words a paraphrase swaps
+PARTIAL_SHARE = (0.3, 0.6) #share of the source a partial overlap takes over
+VARIANTS = ('copy', 'paraphrase', 'partial')
+MAX_EXACT_PAIRS = 2000000 #corpora with more pairs skip the all-pairs modes
+
+#mode name -> (analysis method, Detector keyword arguments); 'exact' is the baseline the others are measured against
+MODES = {
+    'exact': (ALL_PAIRS, {}),
+    'hashed': (ALL_PAIRS, {'hashed': True}),
+    'threshold': (THRESHOLD_PAIRS, {}),
+    'lsh': (LSH_PAIRS, {}),
+    'sketch': (ALL_PAIRS, {'hugeBytes': 0}),
+}
+ALL_PAIRS_MODES = ('exact', 'hashed', 'sketch')
+
+def makeVocabulary(rng, size=VOCABULARY_SIZE):
+    '''returns size distinct pronounceable made-up words'''
+    consonants, vowels = 'bcdfghjklmnprstvwz', 'aeiou'
+    words = set()
+    while len(words) < size:
+        syllables = rng.randint(1, 4)
+        words.add(''.join(rng.choice(consonants) + rng.choice(vowels) for _ in range(syllables)))
+    return sorted(words)
+
+class TextGenerator:
+    '''draws words with Zipf-like frequencies, so common words repeat across documents like in real text'''
+
+    def __init__(self, seed=0, vocabularySize=VOCABULARY_SIZE):
+        self.rng = random.Random(seed)
+        self.vocabulary = makeVocabulary(self.rng, vocabularySize)
+        self.rng.shuffle(self.vocabulary)
+        self.weights = list(accumulate(1 / rank for rank in range(1, vocabularySize + 1)))
+
+    def words(self, count):
+        '''returns count random words'''
+        return self.rng.choices(self.vocabulary, cum_weights=self.weights, k=count)
+
+    def paraphrase(self, words, replace=PARAPHRASE_REPLACE, swap=PARAPHRASE_SWAP):
+        '''returns a copy of words with some replaced by random words and some adjacent ones swapped'''
+        result = [self.words(1)[0] if self.rng.random() < replace else word for word in words]
+        for i in range(len(result) - 1):
+            if self.rng.random() < swap:
+                result[i], result[i + 1] = result[i + 1], result[i]
+        return result
+
+    def partial(self, words, length, share=PARTIAL_SHARE):
+        '''returns a new text of about length words with a passage of words spliced into it'''
+        taken = max(1, int(len(words) * self.rng.uniform(*share)))
+        start = self.rng.randrange(len(words) - taken + 1)
+        own = self.words(max(0, length - taken))
+        at = self.rng.randrange(len(own) + 1)
+        return own[:at] + words[start:start + taken] + own[at:]
+
+    def variant(self, kind, words, length):
+        '''returns a plagiarized version of words of the given kind'''
+        if kind == 'copy':
+            return list(words)
+        if kind == 'paraphrase':
+            return self.paraphrase(words)
+        return self.partial(words, length)
+
+def checkTextGenerator():
+    '''checks a small generator's words, paraphrases and partial overlaps, keeping the generator local'''
+    generator = TextGenerator(1, 50)
+    assert len(generator.words(30)) == 30
+    assert generator.paraphrase(['a'] * 10, replace=0, swap=0) == ['a'] * 10
+    assert len(generator.partial(list('abcdefghij'), 20)) >= 20
+
+checkTextGenerator()
+
+def documentText(words, lineWords=LINE_WORDS):
+    '''returns words as text wrapped at lineWords words per line'''
+    return "\n".join(" ".join(words[i:i + lineWords]) for i in range(0, len(words), lineWords)) + "\n"
+
+assert documentText(['a', 'b', 'c'], 2) == "a b\nc\n"
+
+def generateCorpus(folder, documents, length=200, plagiarismRate=0.1, variants=VARIANTS, seed=0):
+    '''
+    writes documents .txt files of about length words to folder; a plagiarismRate share of them
+    are variants of an earlier document. Returns {(source, copy): variant} for the planted pairs
+    '''
+    generator = TextGenerator(seed)
+    texts = []
+    planted = {}
+    width = len(str(documents))
+    for doc in range(documents):
+        path = os.path.join(folder, "doc{:0{}d}.txt".format(doc, width))
+        if texts and generator.rng.random() < plagiarismRate:
+            source = generator.rng.randrange(len(texts))
+            kind = generator.rng.choice(variants)
+            words = generator.variant(kind, texts[source][1], length)
+            planted[(texts[source][0], path)] = kind
+        else:
+            words = generator.words(length)
+        texts.append((path, words))
+        with open(path, 'w') as file:
+            file.write(documentText(words))
+    return planted
+
+def pairKey(file1, file2):
+    '''returns a file pair in a fixed order, whichever order a mode reported it in'''
+    return (file1, file2) if file1 <= file2 else (file2, file1)
+
+def flaggedPairs(rows):
+    '''returns {pair: average similarity} of every analyzed pair, and the set of pairs flagged as plagiarized'''
+    scores, flagged = {}, set()
+    for row in rows:
+        key = pairKey(row[0], row[1])
+        scores[key] = row[4]
+        if row[5] == "Plagiarized":
+            flagged.add(key)
+    return scores, flagged
+
+def accuracy(exactRows, rows):
+    '''returns (precision, recall, mean absolute score error) of rows against the exact rows of the same corpus'''
+    exactScores, exactFlagged = flaggedPairs(exactRows)
+    scores, flagged = flaggedPairs(rows)
+    hits = len(flagged & exactFlagged)
+    precision = hits / len(flagged) if flagged else 1.0
+    recall = hits / len(exactFlagged) if exactFlagged else 1.0
+    common = [key for key in scores if key in exactScores]
+    error = sum(abs(scores[key] - exactScores[key]) for key in common) / len(common) if common else 0.0
+    return precision, recall, error
+
+assert accuracy([('a', 'b', 0, 0, 0.75, "Plagiarized"), ('a', 'c', 0, 0, 0.125, "Not Plagiarized")],
+                [('b', 'a', 0, 0, 0.5, "Plagiarized")]) == (1.0, 1.0, 0.25)
+
+def plantedRecall(planted, flagged):
+    '''returns the share of planted pairs of each variant that were flagged as plagiarized'''
+    found, total = {}, {}
+    for pair, kind in planted.items():
+        total[kind] = total.get(kind, 0) + 1
+        found[kind] = found.get(kind, 0) + (pairKey(*pair) in flagged)
+    return {kind: found[kind] / total[kind] for kind in sorted(total)}
+
+def peakMemory():
+    '''returns the peak resident memory of this process in bytes, or the tracemalloc peak where there is no resource module'''
+    if resource is None:
+        return tracemalloc.get_traced_memory()[1]
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def runMode(files, mode, workers=1):
+    '''
+    analyzes files with one mode and returns (rows, measurements);
+    meant to run in a fresh process (see isolatedRun()) so the peak memory belongs to this run alone
+    '''
+    method, settings = MODES[mode]
+    profile = Profile()
+    detector = Detector(files, workers=workers, profile=profile, **settings)
+    if resource is None:
+        tracemalloc.start()
+    start = time.perf_counter()
+    rows = detector.analyze(method)
+    seconds = time.perf_counter() - start
+    peak = peakMemory()
+    counters = profile.counters
+    measurements = {
+        'mode': mode,
+        'documents': len(files),
+        'seconds': round(seconds, 4),
+        'docsPerSecond': round(len(files) / seconds, 1) if seconds else None,
+        'megabytesPerSecond': round(counters.get('bytes', 0) / (1 << 20) / seconds, 3) if seconds else None,
+        'pairsEvaluated': counters.get('pairs.evaluated', 0),
+        'pairsPerSecond': round(counters.get('pairs.evaluated', 0) / seconds, 1) if seconds else None,
+        'peakMegabytes': round(peak / (1 << 20), 2),
+        'stages': {name: round(stageSeconds, 4) for name, (stageSeconds, calls) in profile.stages.items()},
+    }
+    return rows, measurements
+
+def isolatedRun(files, mode, workers=1):
+    '''
+    runs runMode() in a new process and returns its result; the process comes from a fork server where there is one,
+    since a process forked from the benchmark itself would start with the benchmark's peak memory
+    '''
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context(method)) as executor:
+        return executor.submit(runMode, files, mode, workers).result()
+
+def benchmarkScale(documents, modes, length=200, plagiarismRate=0.1, seed=0, workers=1, maxExactPairs=MAX_EXACT_PAIRS, folder=None):
+    '''generates one corpus and returns the measurements of every mode on it'''
+    with tempfile.TemporaryDirectory(dir=folder) as corpusFolder:
+        start = time.perf_counter()
+        planted = generateCorpus(corpusFolder, documents, length, plagiarismRate, seed=seed)
+        generated = time.perf_counter() - start
+        files = sorted(os.path.join(corpusFolder, name) for name in os.listdir(corpusFolder))
+        pairs = documents * (documents - 1) // 2
+        exactRows = None
+        results = []
+        for mode in modes:
+            if mode in ALL_PAIRS_MODES and pairs > maxExactPairs:
+                results.append({'mode': mode, 'documents': documents, 'skipped': "more than {} pairs".format(maxExactPairs)})
+                continue
+            rows, measurements = isolatedRun(files, mode, workers)
+            measurements['generateSeconds'] = round(generated, 4)
+            measurements['plantedRecall'] = plantedRecall(planted, flaggedPairs(rows)[1])
+            if mode == 'exact':
+                exactRows = rows
+            elif exactRows is not None:
+                precision, recall, error = accuracy(exactRows, rows)
+                measurements.update(precision=round(precision, 4), recall=round(recall, 4), scoreError=round(error, 4))
+            results.append(measurements)
+    return results
+
+RESULT_LINE = "{:>8} {:<12}{:>10}{:>11}{:>13}{:>10}{:>10}{:>8}{:>9}  {}"
+RESULT_HEADER = RESULT_LINE.format('Docs', 'Mode', 'Seconds', 'Docs/s', 'Pairs/s', 'Peak MB', 'Precision', 'Recall', 'Error', 'Planted recall')
+
+def formatResult(result):
+    '''returns the measurements of one run as a line of the results table'''
+    if 'skipped' in result:
+        return "{:>8} {:<12}skipped, {}".format(result['documents'], result['mode'], result['skipped'])
+    planted = ", ".join("{} {:.2f}".format(kind, share) for kind, share in result['plantedRecall'].items())
+    return RESULT_LINE.format(result['documents'], result['mode'], "{:.3f}".format(result['seconds']), result['docsPerSecond'],
+                              result['pairsPerSecond'], result['peakMegabytes'],
+                              result.get('precision', '-'), result.get('recall', '-'), result.get('scoreError', '-'), planted)
+
+def parseArguments(argv=None):
+    '''returns the command line options of the benchmark'''
+    parser = argparse.ArgumentParser(description="Times the Plagiarism Detector's modes on synthetic corpora and checks the approximate ones against exact Jaccard")
+    parser.add_argument('--scales', type=int, nargs='+', default=[100, 1000], help="corpus sizes to run, in documents (e.g. 100 1000 10000 100000)")
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES), help="modes to time; exact runs first so the others can be scored against it")
+    parser.add_argument('--length', type=int, default=200, help="words per generated document")
+    parser.add_argument('--rate', type=float, default=0.1, help="share of documents that plagiarize an earlier one")
+    parser.add_argument('--seed', type=int, default=0, help="random seed of the corpus generator")
+    parser.add_argument('--workers', type=int, default=1, help="worker processes per run (peak memory only covers the run's main process)")
+    parser.add_argument('--max-exact-pairs', type=int, default=MAX_EXACT_PAIRS, help="skip the all-pairs modes on corpora with more pairs than this")
+    parser.add_argument('--folder', help="where to write the generated corpora (default: the system temp folder)")
+    parser.add_argument('--json', metavar='PATH', help="also write every measurement to PATH as JSON")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    '''runs the benchmark at every requested scale and prints a table of the results'''
+    args = parseArguments(argv)
+    modes = sorted(args.modes, key=lambda mode: mode != 'exact')
+    results = []
+    print(RESULT_HEADER)
+    for documents in args.scales:
+        scale = benchmarkScale(documents, modes, args.length, args.rate, args.seed, args.workers, args.max_exact_pairs, args.folder)
+        for result in scale:
+            print(formatResult(result), flush=True)
+        results.extend(scale)
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=2)
+
+if __name__ == '__main__':
+    main()
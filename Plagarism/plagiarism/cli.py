@@ -0,0 +1,150 @@
+'''
+Command line entry point of the Plagiarism Detector
+Run as "python -m plagiarism" or through "Plagiarism Detector.py".
+'''
+
+import argparse
+import contextlib
+import os
+import sys
+
+from . import ingest, minhash, streaming, threshold_join
+from .detector import ALL_PAIRS, LSH_BANDS, LSH_PAIRS, LSH_ROWS, MINHASH_PERMUTATIONS, PLAGIARISM_THERSHOLD, THRESHOLD_PAIRS, WINNOW_THRESHOLD, Detector
+from .profiling import Profile
+from .report import drawQueryReport, drawReport, drawWinnowReport
+
+TABLE_PAIR_LIMIT = 1000 #larger runs are streamed as CSV instead of drawn as a table
+DOCUMENT_PATTERN = '*txt' #default --pattern
+
+def currentDirectory():
+    '''returns current directory'''
+    return os.getcwd()
+
+def describeDocuments(pattern):
+    '''returns how the scanned documents are named in messages: ".txt files" for the default pattern, otherwise the pattern itself'''
+    if pattern == DOCUMENT_PATTERN:
+        return ".txt files"
+    return "files matching {!r}".format(pattern)
+
+assert describeDocuments('*.md') == "files matching '*.md'"
+
+def parseArguments(argv=None):
+    '''returns the command line options of the detector'''
+    parser = argparse.ArgumentParser(description="Scans all .txt files in the current directory (or the given paths) for plagiarism")
+    parser.add_argument('paths',nargs='*',default=['.'],help="files and directories to scan (default: the current directory)")
+    parser.add_argument('--recursive','-r',action='store_true',help="also scan all subdirectories")
+    parser.add_argument('--pattern',default=DOCUMENT_PATTERN,help="file name pattern of the documents to scan")
+    parser.add_argument('--huge-mb',type=float,default=ingest.HUGE_DOCUMENT_BYTES/(1 << 20),help="documents above this size, and the pairs involving them, are compared on bottom-k sketches of their shingle hashes")
+    parser.add_argument('--threshold',type=float,default=PLAGIARISM_THERSHOLD,help="average similarity above which a pair counts as plagiarized")
+    parser.add_argument('--span-lines',action='store_true',help="let shingles run across line breaks (better for hard-wrapped text)")
+    parser.add_argument('--hashed',action='store_true',help="keep shingles as sorted 64-bit hash arrays instead of sets of word tuples")
+    parser.add_argument('--collisions',action='store_true',help="print the shingle hash collision rate after the report")
+    parser.add_argument('--workers',type=int,default=1,help="number of worker processes for shingling and pair scoring (0 = one per CPU)")
+    parser.add_argument('--lsh',action='store_true',help="only score candidate pairs found by the MinHash/LSH index")
+    parser.add_argument('--permutations',type=int,default=MINHASH_PERMUTATIONS,help="MinHash signature length")
+    parser.add_argument('--bands',type=int,default=LSH_BANDS,help="LSH bands, more bands = higher recall")
+    parser.add_argument('--rows',type=int,default=LSH_ROWS,help="signature rows per LSH band, more rows = higher precision")
+    parser.add_argument('--index',metavar='PATH',help="SQLite index of fingerprints and pair results reused between runs")
+    parser.add_argument('--matrix',action='store_true',help="score all pairs at once with a sparse document x shingle matrix (needs numpy and scipy)")
+    parser.add_argument('--threshold-join',action='store_true',help="skip pairs that provably cannot reach the plagiarism threshold")
+    parser.add_argument('--winnow',action='store_true',help="compare compact winnowing fingerprints and show the matching passages")
+    parser.add_argument('--winnow-threshold',type=float,default=WINNOW_THRESHOLD,
+                        help="fingerprint similarity above which --winnow counts a pair as plagiarized (fingerprint similarity runs lower than --threshold's average)")
+    parser.add_argument('--query',metavar='FILE',help="only check FILE against the indexed corpus (or the current directory) and list its best matches")
+    parser.add_argument('--top',type=int,default=10,help="number of matches listed by --query")
+    parser.add_argument('--format',choices=['table','csv','jsonl'],default='table',help="report format; csv and jsonl are written while pairs are scored")
+    parser.add_argument('--output',metavar='PATH',help="write the report to PATH instead of the screen")
+    parser.add_argument('--min-score',type=float,help="only report pairs whose average similarity is at least this")
+    parser.add_argument('--top-per-doc',type=int,help="only report the K best matches of each document")
+    parser.add_argument('--profile',action='store_true',help="print the time spent in each stage and the pipeline counters")
+    parser.add_argument('--profile-json',metavar='PATH',help="write the stage times, counters and a trace of every stage to PATH as JSON")
+    return parser.parse_args(argv)
+
+def openReport(path):
+    '''returns a context manager for the stream the report goes to: the file at path, or the screen when path is None'''
+    if path:
+        return open(path,'w',newline='')
+    return contextlib.nullcontext(sys.stdout)
+
+def reportProfile(args,profile,argv,messages):
+    '''prints and/or saves the profile of a run as requested on the command line'''
+    if args.profile:
+        print("\n" + profile.summary(),file=messages)
+    if args.profile_json:
+        profile.dumpJson(args.profile_json,argv=sys.argv[1:] if argv is None else list(argv))
+
+def main(argv=None):
+    '''scans all files in the current directory and returns a report outlining which files are likely plagiarized'''
+    args = parseArguments(argv)
+    profile = Profile()
+    with profile.stage('discover'):
+        files = ingest.discoverFiles(args.paths,args.pattern,args.recursive)
+        if args.output:
+            files = [file for file in files if os.path.abspath(file) != os.path.abspath(args.output)] #never scan an earlier report
+    detector = Detector(files,threshold=args.threshold,spanLines=args.span_lines,hashed=args.hashed,
+                        workers=args.workers if args.workers > 0 else os.cpu_count(),
+                        permutations=args.permutations,bands=args.bands,rows=args.rows,hugeBytes=int(args.huge_mb*(1 << 20)),
+                        winnowThreshold=args.winnow_threshold,profile=profile)
+    outputFormat = args.format
+    if args.query or args.winnow:
+        outputFormat = 'table'
+    elif outputFormat == 'table' and detector.numOfFilePairs() > TABLE_PAIR_LIMIT:
+        print("More than",TABLE_PAIR_LIMIT,"file pairs, writing CSV instead of a table",file=sys.stderr)
+        outputFormat = 'csv'
+    messages = sys.stdout if outputFormat == 'table' or args.output else sys.stderr
+    print("Plagiarism Detection App:" "\n",file=messages)
+    if args.query:
+        matches = detector.query(args.query,args.index,args.top)
+        with profile.stage('render'), openReport(args.output) as out:
+            drawQueryReport(args.query,matches,detector.status,out)
+        reportProfile(args,profile,argv,messages)
+        return
+    if args.paths == ['.']:
+        print("Analyzing all",describeDocuments(args.pattern),"in", currentDirectory(),file=messages)
+    else:
+        print("Analyzing all",describeDocuments(args.pattern),"in", ", ".join(args.paths),file=messages)
+    if args.winnow:
+        fileData = detector.analyzeWinnow()
+        with profile.stage('render'), openReport(args.output) as out:
+            drawWinnowReport(fileData,out)
+        print("You have",sum(1 for row in fileData if row[3] == "Plagiarized"),"plagiarized file(s)!")
+        reportProfile(args,profile,argv,messages)
+        return
+    method = ALL_PAIRS
+    if args.lsh:
+        method = LSH_PAIRS
+    elif args.threshold_join:
+        method = THRESHOLD_PAIRS
+    if args.index:
+        fileData, summary = detector.analyzeIndexed(args.index,method)
+    elif args.matrix:
+        fileData = detector.analyzeMatrix()
+    else:
+        fileData = detector.iterAnalyze(method)
+    counts = {}
+    fileData = streaming.countStatus(fileData,counts)
+    if args.min_score is not None:
+        fileData = streaming.aboveFloor(fileData,args.min_score)
+    if args.top_per_doc:
+        fileData = streaming.topPerDocument(fileData,args.top_per_doc)
+    with profile.stage('render'), openReport(args.output) as out:
+        if outputFormat == 'table':
+            drawReport(list(fileData),out)
+        else:
+            streaming.WRITERS[outputFormat](fileData,out)
+    if args.index:
+        print(summary,file=messages)
+    if detector.ingestStats:
+        print(ingest.ingestReport(*detector.ingestStats),file=messages)
+    if detector.usesSketches():
+        print("{} document(s) above {} MB: the {} pair(s) involving them were compared on bottom-k sketches, all other pairs on full shingle sets".format(
+            len(detector.hugeDocuments()),args.huge_mb,detector.numOfSketchedPairs()),file=messages)
+    if method == LSH_PAIRS:
+        print(minhash.pruningReport(detector.numOfFilePairs(),counts.get('pairs',0)),file=messages)
+    elif method == THRESHOLD_PAIRS:
+        print(threshold_join.joinReport(detector.numOfFilePairs(),counts.get('pairs',0)),file=messages)
+    if args.collisions:
+        shingles, hashes, rate = detector.collisionReport()
+        print("Shingle hashing: {} distinct shingle(s), {} distinct hash(es), collision rate {:.6f}".format(shingles,hashes,rate),file=messages)
+    print("You have",counts.get("Plagiarized",0),"plagiarized file(s)!",file=messages)
+    reportProfile(args,profile,argv,messages)
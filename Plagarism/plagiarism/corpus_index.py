@@ -0,0 +1,167 @@
+'''
+Persistent SQLite index for repeated plagiarism scans
+Keeps the hashed shingle fingerprints of every document (keyed by content hash)
+and the similarity stats of every scored pair, so a rescan only shingles new or
+changed files and only scores pairs that involve them. Documents that are no
+longer scanned are dropped on rescan, with the fingerprints and pair results
+nothing refers to any more. The postings table maps every (width, shingle hash)
+to the (integer ids of the) contents that have it, so a query only reads the
+rows of its own hashes.
+'''
+
+import hashlib
+import sqlite3
+from array import array
+from itertools import repeat
+
+from .inverted_index import rankMatches
+
+SCHEMA_VERSION = 2 #bumped when the tables change; older indexes are rebuilt
+CACHE_KB = 65536 #SQLite page cache, large enough to keep posting inserts from re-reading pages
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS documents (path TEXT PRIMARY KEY, mtime INTEGER, size INTEGER, digest TEXT);
+CREATE TABLE IF NOT EXISTS fingerprints (digest TEXT, width INTEGER, hashes BLOB, PRIMARY KEY (digest, width));
+CREATE TABLE IF NOT EXISTS pairs (digest1 TEXT, digest2 TEXT, low REAL, high REAL, avg REAL, PRIMARY KEY (digest1, digest2));
+CREATE TABLE IF NOT EXISTS contents (id INTEGER PRIMARY KEY, digest TEXT UNIQUE);
+CREATE TABLE IF NOT EXISTS postings (width INTEGER, hash INTEGER, content INTEGER, PRIMARY KEY (width, hash, content)) WITHOUT ROWID;
+'''
+
+def openIndex(path, config):
+    '''
+    opens (or creates) the index at path and returns the connection
+    config is a string describing the shingling settings; stored fingerprints and pairs are dropped when it changes
+    '''
+    config = "{};schema={}".format(config, SCHEMA_VERSION)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA cache_size = -{}".format(CACHE_KB))
+    conn.executescript(SCHEMA)
+    row = conn.execute("SELECT value FROM meta WHERE key = 'config'").fetchone()
+    if row is None or row[0] != config:
+        conn.execute("DELETE FROM fingerprints")
+        conn.execute("DELETE FROM pairs")
+        conn.execute("DELETE FROM documents")
+        conn.execute("DELETE FROM postings")
+        conn.execute("DELETE FROM contents")
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('config', ?)", (config,))
+        conn.commit()
+    return conn
+
+def fileDigest(path):
+    '''returns the SHA-1 hex digest of a file's contents'''
+    digest = hashlib.sha1()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def storedDigest(conn, path, mtime, size):
+    '''returns the stored content digest of path if its mtime and size are unchanged, otherwise None'''
+    row = conn.execute("SELECT mtime, size, digest FROM documents WHERE path = ?", (path,)).fetchone()
+    if row is not None and row[0] == mtime and row[1] == size:
+        return row[2]
+    return None
+
+def storeDocument(conn, path, mtime, size, digest):
+    '''records the current mtime, size and content digest of path'''
+    conn.execute("INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?)", (path, mtime, size, digest))
+
+def loadFingerprints(conn, digest):
+    '''returns {width: sorted hash array} stored for a content digest, or None if it has not been indexed'''
+    rows = conn.execute("SELECT width, hashes FROM fingerprints WHERE digest = ?", (digest,)).fetchall()
+    if not rows:
+        return None
+    fingerprints = {}
+    for width, blob in rows:
+        hashes = array('Q')
+        hashes.frombytes(blob)
+        fingerprints[width] = hashes
+    return fingerprints
+
+def signedHashes(hashes):
+    '''returns an array of 64-bit hashes reinterpreted as signed integers, the range SQLite can store'''
+    signed = array('q')
+    signed.frombytes(hashes.tobytes())
+    return signed
+
+assert list(signedHashes(array('Q', [1, 2**64 - 1]))) == [1, -1]
+
+def contentId(conn, digest):
+    '''returns the integer id postings use for a content digest, assigning one if it has none'''
+    conn.execute("INSERT OR IGNORE INTO contents (digest) VALUES (?)", (digest,))
+    return conn.execute("SELECT id FROM contents WHERE digest = ?", (digest,)).fetchone()[0]
+
+def storeFingerprints(conn, digest, fingerprints):
+    '''stores the {width: sorted hash array} fingerprints of a content digest and their postings'''
+    content = contentId(conn, digest)
+    for width, hashes in fingerprints.items():
+        conn.execute("INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?)", (digest, width, hashes.tobytes()))
+        conn.executemany("INSERT OR IGNORE INTO postings VALUES (?, ?, ?)", zip(repeat(width), signedHashes(hashes), repeat(content)))
+
+def deleteFingerprints(conn, digest):
+    '''removes the fingerprints of a content digest and their postings'''
+    content = contentId(conn, digest)
+    for width, hashes in (loadFingerprints(conn, digest) or {}).items():
+        conn.executemany("DELETE FROM postings WHERE width = ? AND hash = ? AND content = ?", zip(repeat(width), signedHashes(hashes), repeat(content)))
+    conn.execute("DELETE FROM fingerprints WHERE digest = ?", (digest,))
+    conn.execute("DELETE FROM contents WHERE id = ?", (content,))
+
+def removeMissingDocuments(conn, paths):
+    '''
+    deletes the documents whose path is not in paths, then the fingerprints and pair results of contents
+    no remaining document has; returns the number of documents removed
+    '''
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS scanned (path TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM scanned")
+    conn.executemany("INSERT OR IGNORE INTO scanned VALUES (?)", ((path,) for path in paths))
+    removed = conn.execute("DELETE FROM documents WHERE path NOT IN (SELECT path FROM scanned)").rowcount
+    orphans = conn.execute("SELECT DISTINCT digest FROM fingerprints WHERE digest NOT IN (SELECT digest FROM documents)").fetchall()
+    for digest, in orphans:
+        deleteFingerprints(conn, digest)
+    conn.execute("DELETE FROM pairs WHERE digest1 NOT IN (SELECT digest FROM documents) OR digest2 NOT IN (SELECT digest FROM documents)")
+    return removed
+
+def queryIndex(conn, fingerprints, k=10, exclude=None):
+    '''
+    returns up to k (path, min, max, avg) tuples for the indexed documents most similar to fingerprints ({width: sorted hash array}),
+    reading only the postings of those hashes and the set sizes of the documents that share one of them
+    '''
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS queryHashes (width INTEGER, hash INTEGER, PRIMARY KEY (width, hash)) WITHOUT ROWID")
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS matched (digest TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM queryHashes")
+    conn.execute("DELETE FROM matched")
+    for width, hashes in fingerprints.items():
+        conn.executemany("INSERT OR IGNORE INTO queryHashes VALUES (?, ?)", ((width, h) for h in signedHashes(hashes)))
+    shared = {}
+    rows = conn.execute("SELECT contents.digest, postings.width, COUNT(*) FROM queryHashes CROSS JOIN postings "
+                        "ON postings.width = queryHashes.width AND postings.hash = queryHashes.hash "
+                        "JOIN contents ON contents.id = postings.content GROUP BY postings.content, postings.width")
+    for digest, width, count in rows:
+        shared.setdefault(digest, {})[width] = count
+    conn.executemany("INSERT INTO matched VALUES (?)", ((digest,) for digest in shared))
+    common = {}
+    sizes = {}
+    rows = conn.execute("SELECT documents.path, documents.digest, fingerprints.width, length(fingerprints.hashes) / 8 FROM documents "
+                        "JOIN fingerprints ON fingerprints.digest = documents.digest WHERE documents.digest IN (SELECT digest FROM matched)")
+    for path, digest, width, size in rows:
+        common[path] = shared[digest]
+        sizes.setdefault(path, {})[width] = size
+    return rankMatches(fingerprints, common, sizes, k, exclude)
+
+def pairKey(digest1, digest2):
+    '''returns the two digests in the order they are stored in the pairs table'''
+    return (digest1, digest2) if digest1 <= digest2 else (digest2, digest1)
+
+def loadAllPairStats(conn):
+    '''returns {(digest1, digest2): (min, max, avg)} for every stored pair, keyed as pairKey() orders them, in one query'''
+    return {(digest1, digest2): (low, high, avg) for digest1, digest2, low, high, avg in conn.execute("SELECT digest1, digest2, low, high, avg FROM pairs")}
+
+def storePairStats(conn, digest1, digest2, stats):
+    '''stores the (min, max, avg) similarity of two content digests'''
+    conn.execute("INSERT OR REPLACE INTO pairs VALUES (?, ?, ?, ?, ?)", pairKey(digest1, digest2) + tuple(stats))
+
+def reuseReport(reusedDocs, recomputedDocs, reusedPairs, computedPairs, removedDocs=0):
+    '''returns a one-line summary of how much work the index saved'''
+    return "Index reused {} document(s), recomputed {}, removed {} missing; reused {} pair result(s), computed {}".format(
+        reusedDocs, recomputedDocs, removedDocs, reusedPairs, computedPairs)
@@ -0,0 +1,436 @@
+'''
+Plagiarism Detector engine
+A Detector takes an explicit list of files plus its settings and does no I/O
+until one of its methods is called. Optional pieces (process pools, the SQLite
+index, numpy/scipy) are only imported by the methods that use them.
+'''
+
+import os
+import time
+from collections import deque
+from itertools import combinations, islice
+
+from . import ingest, shingle_hash
+from .profiling import Profile
+from .shingles import SHINGLE_HIGH_RANGE, SHINGLE_LOW_RANGE, roundedStats, shingleFile, shingleSimilarityIndex
+
+PLAGIARISM_THERSHOLD = 0.55 #above 55% considered to be plagiarism
+MINHASH_PERMUTATIONS = 128 #signature length, more permutations give a better similarity estimate
+LSH_BANDS = 32 #more bands = higher recall, more candidate pairs
+LSH_ROWS = 4 #more rows per band = higher precision, fewer candidate pairs
+LSH_SHINGLE_WIDTH = 3 #shingle width used to build the MinHash signatures
+WINNOW_KGRAM = 5 #words per hashed k-gram in winnowing mode, shorter matches are treated as noise
+WINNOW_WINDOW = 4 #k-grams per winnowing window, any match of WINNOW_WINDOW + WINNOW_KGRAM - 1 words is detected
+#fingerprint similarity above which winnowing mode reports plagiarism; fingerprint Jaccard runs well below the average
+#shingle similarity, and on the benchmark corpus 0.3 flags every pair whose average is above PLAGIARISM_THERSHOLD
+WINNOW_THRESHOLD = 0.3
+PAIR_BLOCK_SIZE = 2000 #file pairs scored per task in parallel mode, keeps IPC overhead small
+
+ALL_PAIRS = 'all' #score every pair
+LSH_PAIRS = 'lsh' #only score candidate pairs found by the MinHash/LSH index
+THRESHOLD_PAIRS = 'threshold' #only score pairs that can still reach the threshold
+
+def pairBlocks(pairs,size):
+    '''splits an iterable of file pairs into lists of at most size pairs'''
+    pairs = iter(pairs)
+    block = list(islice(pairs,size))
+    while block:
+        yield block
+        block = list(islice(pairs,size))
+
+assert list(pairBlocks(combinations('abcd',2),4)) == [[('a','b'),('a','c'),('a','d'),('b','c')],[('b','d'),('c','d')]]
+
+workerDetector = None #detector of a worker process, set by initWorker()
+workerCorpus = {} #shingle corpus of a scoring worker process, set by initWorker()
+
+def initWorker(detector,corpus):
+    '''stores the detector settings and shingle corpus once per worker process so tasks only carry file names'''
+    global workerDetector, workerCorpus
+    workerDetector = detector
+    workerCorpus = corpus
+
+def shingleDocumentTask(file):
+    '''shingles one file inside a worker process'''
+    return workerDetector.shingleDocument(file)
+
+def scorePairBlockTask(pairs):
+    '''scores one block of file pairs inside a worker process'''
+    return workerDetector.scorePairs(workerCorpus,pairs)
+
+class Detector:
+    '''
+    Scores pairs of text files for plagiarism by comparing their shingle sets.
+    Shingled documents are cached on the detector, so a long-running process can
+    keep one detector and call several of its methods without re-reading files.
+    '''
+
+    def __init__(self,files,threshold=PLAGIARISM_THERSHOLD,lowWidth=SHINGLE_LOW_RANGE,highWidth=SHINGLE_HIGH_RANGE,
+                 spanLines=False,hashed=False,workers=1,blockSize=PAIR_BLOCK_SIZE,
+                 permutations=MINHASH_PERMUTATIONS,bands=LSH_BANDS,rows=LSH_ROWS,lshWidth=LSH_SHINGLE_WIDTH,
+                 winnowKgram=WINNOW_KGRAM,winnowWindow=WINNOW_WINDOW,winnowThreshold=WINNOW_THRESHOLD,hugeBytes=ingest.HUGE_DOCUMENT_BYTES,profile=None):
+        self.files = list(files)
+        self.threshold = threshold
+        self.lowWidth = lowWidth
+        self.highWidth = highWidth
+        self.spanLines = spanLines
+        self.hashed = hashed
+        self.workers = workers
+        self.blockSize = blockSize
+        self.permutations = permutations
+        self.bands = bands
+        self.rows = rows
+        self.lshWidth = lshWidth
+        self.winnowKgram = winnowKgram
+        self.winnowWindow = winnowWindow
+        self.winnowThreshold = winnowThreshold
+        self.hugeBytes = hugeBytes
+        self.hugeFiles = None
+        self.partnerSketches = {}
+        self.ingestStats = None
+        self.profile = profile if profile is not None else Profile()
+        self.corpus = None
+        self.invertedIndex = None
+
+    def __getstate__(self):
+        '''leaves the cached corpus, inverted index and profile out when the detector is sent to worker processes'''
+        state = self.__dict__.copy()
+        state['corpus'] = None
+        state['invertedIndex'] = None
+        state['profile'] = Profile()
+        return state
+
+    def widths(self):
+        '''returns the shingle widths every pair is compared at'''
+        return range(self.lowWidth,self.highWidth)
+
+    def numOfFilePairs(self):
+        '''returns the number of unique file pairs'''
+        return len(self.files)*(len(self.files)-1)//2
+
+    def hugeDocuments(self):
+        '''
+        returns the set of files larger than hugeBytes; they are reduced to bottom-k sketches of their
+        shingle hashes, so they are never held as full shingle sets
+        '''
+        if self.hugeFiles is None:
+            self.hugeFiles = {file for file in self.files if os.path.getsize(file) > self.hugeBytes}
+        return self.hugeFiles
+
+    def usesSketches(self):
+        '''returns True if any file is huge; only the pairs involving huge files are compared on sketches'''
+        return bool(self.hugeDocuments())
+
+    def isHugePair(self,file1,file2):
+        '''returns True if a pair involves a huge file and is therefore compared on sketches'''
+        huge = self.hugeDocuments()
+        return file1 in huge or file2 in huge
+
+    def numOfSketchedPairs(self):
+        '''returns the number of file pairs that involve a huge file'''
+        huge = len(self.hugeDocuments())
+        return huge*(len(self.files)-huge) + huge*(huge-1)//2
+
+    def shingleDocument(self,file,hashed=None):
+        '''returns {width: shingle set} for one file, reading it once through a memory map; huge files give their sketch'''
+        if hashed is None:
+            hashed = self.hashed
+        if os.path.getsize(file) > self.hugeBytes:
+            return ingest.streamSketch(file,self.widths(),self.spanLines)
+        return ingest.streamShingles(file,self.widths(),self.spanLines,hashed)
+
+    def sketchPartners(self,corpus):
+        '''
+        sketches the files of corpus that are not huge when it has huge ones, so pairs involving a huge file
+        compare sketches on both sides; other pairs keep their full shingle sets
+        '''
+        huge = self.hugeDocuments()
+        if huge and not self.partnerSketches:
+            self.partnerSketches = {file: {w: shingle_hash.bottomSketch(corpus[file][w],ingest.SKETCH_SIZE) for w in corpus[file]}
+                                    for file in self.files if file not in huge}
+
+    def pairSets(self,corpus,file1,file2):
+        '''returns the {width: shingle set} of both files of a pair: sketches if the pair involves a huge file'''
+        if not self.isHugePair(file1,file2):
+            return corpus[file1], corpus[file2]
+        return self.partnerSketches.get(file1,corpus[file1]), self.partnerSketches.get(file2,corpus[file2])
+
+    def shingleCorpus(self):
+        '''returns a dict of file name -> {width: shingle set} for every file, shingling each file only once per detector'''
+        if self.corpus is None:
+            start = time.perf_counter()
+            with self.profile.stage('shingle'):
+                if self.workers > 1:
+                    self.corpus = self.parallelShingleCorpus()
+                else:
+                    self.corpus = {file: self.shingleDocument(file) for file in self.files}
+                self.sketchPartners(self.corpus)
+            size = sum(os.path.getsize(file) for file in self.files)
+            self.ingestStats = (len(self.files),size,time.perf_counter() - start)
+            self.countShingles(self.corpus)
+            self.profile.count('files',len(self.files))
+            self.profile.count('bytes',size)
+        return self.corpus
+
+    def countShingles(self,corpus):
+        '''adds the number of shingles of every width in corpus to the profile counters'''
+        for file in corpus:
+            for w in corpus[file]:
+                self.profile.count('shingles.w{}'.format(w),len(corpus[file][w]))
+
+    def parallelShingleCorpus(self):
+        '''shingles the files in a pool of worker processes'''
+        from concurrent.futures import ProcessPoolExecutor
+        chunk = max(1,len(self.files)//(self.workers*4))
+        with ProcessPoolExecutor(self.workers,initializer=initWorker,initargs=(self,{})) as executor:
+            return dict(zip(self.files,executor.map(shingleDocumentTask,self.files,chunksize=chunk)))
+
+    def similarityStats(self,corpus,file1,file2):
+        '''returns min, max and avg similarity of two files of a corpus over the shingle widths, rounded to 3 decimals'''
+        sets1, sets2 = self.pairSets(corpus,file1,file2)
+        if self.isHugePair(file1,file2):
+            return roundedStats([shingle_hash.sketchSimilarityIndex(sets1[w],sets2[w],ingest.SKETCH_SIZE) for w in self.widths()])
+        return roundedStats([shingleSimilarityIndex(sets1[w],sets2[w]) for w in self.widths()])
+
+    def status(self,stats):
+        ''' returns "Plagiarized" if the avg of a (min, max, avg) similarity tuple is greater than the threshold, otherwise returns "Not Plagiarized"'''
+        if stats[2] > self.threshold:
+            return ("Plagiarized",)
+        return ("Not Plagiarized",)
+
+    def iterScorePairs(self,corpus,pairs):
+        '''yields file names, similarity stats and plagiarism status for each file pair as soon as it is scored'''
+        for file1, file2 in pairs:
+            stats = self.similarityStats(corpus,file1,file2)
+            yield (file1,file2) + stats + self.status(stats)
+
+    def scorePairs(self,corpus,pairs):
+        '''returns file names, similarity stats and plagiarism status for each file pair'''
+        return list(self.iterScorePairs(corpus,pairs))
+
+    def iterParallelScorePairs(self,corpus,pairs):
+        '''
+        same as iterScorePairs() but scores blocks of pairs in a pool of worker processes, keeping the input order;
+        at most two blocks per worker are in flight, so memory stays bounded however many pairs there are
+        '''
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(self.workers,initializer=initWorker,initargs=(self,corpus)) as executor:
+            pending = deque()
+            for block in pairBlocks(pairs,self.blockSize):
+                pending.append(executor.submit(scorePairBlockTask,block))
+                if len(pending) >= 2*self.workers:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+
+    def parallelScorePairs(self,corpus,pairs):
+        '''same as scorePairs() but scores blocks of pairs in a pool of worker processes, keeping the input order'''
+        return list(self.iterParallelScorePairs(corpus,pairs))
+
+    def lshCandidatePairs(self,corpus):
+        '''returns the file pairs that share at least one LSH bucket, in the same order as combinations(files,2)'''
+        from . import minhash
+        perms = minhash.hashPermutations(self.permutations)
+        signatures = {}
+        for file in self.files:
+            if self.lshWidth in corpus[file]:
+                shingles = corpus[file][self.lshWidth]
+            else:
+                shingles = shingleFile(file,self.lshWidth,self.spanLines)
+            if isinstance(shingles,set):
+                signatures[file] = minhash.minhashSignature(shingles,perms)
+            else:
+                signatures[file] = minhash.hashedMinhashSignature(shingles,perms)
+        return minhash.candidatePairs(signatures,self.bands,self.rows)
+
+    def thresholdCandidatePairs(self,corpus):
+        '''returns the file pairs whose average similarity can still be above the threshold, in the same order as combinations(files,2)'''
+        from . import threshold_join
+        huge = self.hugeDocuments()
+        return threshold_join.thresholdCandidatePairs(corpus,[file for file in self.files if file not in huge],self.widths(),self.threshold)
+
+    def withHugePairs(self,pairs):
+        '''
+        returns pairs plus every pair involving a huge file, in combinations(files,2) order; the candidate filters
+        work on full shingle sets, so sketched pairs are always scored
+        '''
+        huge = self.hugeDocuments()
+        if not huge:
+            return pairs
+        pairs = set(pairs)
+        pairs.update(pair for pair in combinations(self.files,2) if pair[0] in huge or pair[1] in huge)
+        order = {file: position for position, file in enumerate(self.files)}
+        return sorted(pairs,key=lambda pair: (order[pair[0]],order[pair[1]]))
+
+    def candidatePairs(self,corpus,method=ALL_PAIRS):
+        '''returns the file pairs the given method scores: ALL_PAIRS, LSH_PAIRS or THRESHOLD_PAIRS'''
+        if method == ALL_PAIRS:
+            return combinations(self.files,2)
+        with self.profile.stage('candidates'):
+            if method == LSH_PAIRS:
+                pairs = self.withHugePairs(self.lshCandidatePairs(corpus))
+            else:
+                pairs = self.withHugePairs(self.thresholdCandidatePairs(corpus))
+        self.profile.count('pairs.pruned',self.numOfFilePairs() - len(pairs))
+        return pairs
+
+    def iterAnalyze(self,method=ALL_PAIRS):
+        '''same as analyze() but yields the rows while they are scored instead of collecting them'''
+        corpus = self.shingleCorpus()
+        pairs = self.candidatePairs(corpus,method)
+        if self.workers > 1:
+            rows = self.iterParallelScorePairs(corpus,pairs)
+        else:
+            rows = self.iterScorePairs(corpus,pairs)
+        return self.profile.timedIter('score',rows,'pairs.evaluated')
+
+    def analyze(self,method=ALL_PAIRS):
+        '''returns a list containing file names, similarity stats and plagiarism status for each scored file pair'''
+        return list(self.iterAnalyze(method))
+
+    def analyzeMatrix(self):
+        '''same as analyze() but scores all pairs at once through a sparse document x shingle matrix (needs numpy and scipy)'''
+        from . import sparse_jaccard
+        corpus = self.shingleCorpus()
+        with self.profile.stage('score'):
+            low, high, avg = sparse_jaccard.similarityStatsMatrices(corpus,self.files,self.widths())
+            rows = [stats + self.status(stats[2:]) for stats in sparse_jaccard.pairStats(self.files,low,high,avg)]
+            if self.usesSketches():
+                rows = [next(self.iterScorePairs(corpus,[row[:2]])) if self.isHugePair(*row[:2]) else row for row in rows]
+        self.profile.count('pairs.evaluated',len(rows))
+        return rows
+
+    def analyzeWinnow(self):
+        '''
+        returns file names, fingerprint similarity, plagiarism status and matching passages for each file pair, using winnowing fingerprints
+        instead of full shingle sets; the status compares the fingerprint similarity with winnowThreshold, not threshold
+        '''
+        from . import winnowing
+        with self.profile.stage('shingle'):
+            fingerprints = {file: winnowing.fingerprintFile(file,self.winnowKgram,self.winnowWindow) for file in self.files}
+        self.profile.count('files',len(self.files))
+        self.profile.count('fingerprints',sum(len(fingerprints[file]) for file in self.files))
+        fileByStatus = []
+        with self.profile.stage('score'):
+            for file1, file2 in combinations(self.files,2):
+                similarity = round(winnowing.fingerprintSimilarity(fingerprints[file1],fingerprints[file2]),3)
+                passages = winnowing.matchingPassages(fingerprints[file1],fingerprints[file2],self.winnowWindow + self.winnowKgram)
+                status = "Plagiarized" if similarity > self.winnowThreshold else "Not Plagiarized"
+                fileByStatus.append((file1,file2,similarity,status,passages))
+        self.profile.count('pairs.evaluated',len(fileByStatus))
+        return fileByStatus
+
+    def indexConfig(self):
+        '''returns the shingling settings an index was built with; changing any of them invalidates the index'''
+        return "widths={}-{};span={};huge={};sketch={}".format(self.lowWidth,self.highWidth-1,int(self.spanLines),self.hugeBytes,ingest.SKETCH_SIZE)
+
+    def indexedShingleCorpus(self,conn):
+        '''
+        returns (corpus of hashed shingles, content digest per file, reused, recomputed, removed),
+        only shingling files whose contents are not already in the index and dropping indexed files that are not scanned
+        '''
+        from . import corpus_index
+        corpus = {}
+        digests = {}
+        reused = 0
+        size = 0
+        start = time.perf_counter()
+        self.profile.enter('shingle')
+        for file in self.files:
+            info = os.stat(file)
+            digest = corpus_index.storedDigest(conn,file,info.st_mtime_ns,info.st_size)
+            if digest is None:
+                digest = corpus_index.fileDigest(file)
+                corpus_index.storeDocument(conn,file,info.st_mtime_ns,info.st_size,digest)
+            fingerprints = corpus_index.loadFingerprints(conn,digest)
+            if fingerprints is None:
+                fingerprints = self.shingleDocument(file,True)
+                corpus_index.storeFingerprints(conn,digest,fingerprints)
+                size = size + info.st_size
+            else:
+                reused = reused + 1
+            corpus[file] = fingerprints
+            digests[file] = digest
+        self.sketchPartners(corpus)
+        removed = corpus_index.removeMissingDocuments(conn,self.files)
+        conn.commit()
+        self.profile.leave()
+        self.ingestStats = (len(self.files) - reused,size,time.perf_counter() - start)
+        self.profile.count('files',len(self.files))
+        self.profile.count('bytes',size)
+        self.profile.count('cache.documentHits',reused)
+        self.profile.count('cache.documentMisses',len(self.files) - reused)
+        self.countShingles(corpus)
+        return corpus, digests, reused, len(self.files) - reused, removed
+
+    def analyzeIndexed(self,indexPath,method=ALL_PAIRS):
+        '''same as analyze() but reuses fingerprints and pair results stored in the index at indexPath; also returns the reuse summary'''
+        from . import corpus_index
+        conn = corpus_index.openIndex(indexPath,self.indexConfig())
+        try:
+            corpus, digests, reusedDocs, recomputedDocs, removedDocs = self.indexedShingleCorpus(conn)
+            pairs = list(self.candidatePairs(corpus,method))
+            stored = {}
+            missing = []
+            with self.profile.stage('cache'):
+                pairStats = corpus_index.loadAllPairStats(conn)
+                for file1, file2 in pairs:
+                    stats = pairStats.get(corpus_index.pairKey(digests[file1],digests[file2]))
+                    if stats is None:
+                        missing.append((file1,file2))
+                    else:
+                        stored[(file1,file2)] = (file1,file2) + stats + self.status(stats)
+            self.profile.count('cache.pairHits',len(pairs) - len(missing))
+            self.profile.count('cache.pairMisses',len(missing))
+            with self.profile.stage('score'):
+                if self.workers > 1:
+                    scored = self.parallelScorePairs(corpus,missing)
+                else:
+                    scored = self.scorePairs(corpus,missing)
+            self.profile.count('pairs.evaluated',len(scored))
+            for row in scored:
+                corpus_index.storePairStats(conn,digests[row[0]],digests[row[1]],row[2:5])
+                stored[row[:2]] = row
+            conn.commit()
+        finally:
+            conn.close()
+        summary = corpus_index.reuseReport(reusedDocs,recomputedDocs,len(pairs)-len(missing),len(missing),removedDocs)
+        return [stored[pair] for pair in pairs], summary
+
+    def query(self,queryFile,indexPath=None,k=10):
+        '''
+        returns the k documents most similar to queryFile as (file, min, max, avg) tuples,
+        looking up the query's shingle hashes in the postings stored at indexPath, or in an inverted index
+        of the detector's files (built once per detector) when there is no index
+        '''
+        from . import inverted_index
+        with self.profile.stage('shingle'):
+            fingerprints = self.shingleDocument(queryFile,True)
+        if indexPath:
+            from . import corpus_index
+            conn = corpus_index.openIndex(indexPath,self.indexConfig())
+            try:
+                with self.profile.stage('score'):
+                    return corpus_index.queryIndex(conn,fingerprints,k,exclude=queryFile)
+            finally:
+                conn.close()
+        if self.invertedIndex is None:
+            with self.profile.stage('shingle'):
+                documents = {file: self.shingleDocument(file,True) for file in self.files}
+            with self.profile.stage('index'):
+                self.invertedIndex = inverted_index.buildInvertedIndex(documents)
+            self.profile.count('files',len(documents))
+        with self.profile.stage('score'):
+            return inverted_index.queryInvertedIndex(self.invertedIndex,fingerprints,k,exclude=queryFile)
+
+    def collisionReport(self):
+        '''returns (distinct shingles, distinct hashes, collision rate) of the shingle hashes over all files and widths'''
+        corpus = {file: ingest.streamShingles(file,self.widths(),self.spanLines) for file in self.files}
+        return shingle_hash.collisionReport(corpus[file][w] for file in self.files for w in self.widths())
+
+def numOfPlagiarizedFiles(fileData):
+    '''returns the number of plagiarized file pairs in a result from Detector.analyze()'''
+    count = 0
+    for row in fileData:
+        if row[5] == "Plagiarized":
+            count = count + 1
+    return count
@@ -0,0 +1,127 @@
+'''
+Corpus ingestion for the Plagiarism Detector
+Walks directory trees for documents, reads each one through a memory map and
+tokenizes it lazily, so only the current shingle window is held while reading.
+Text is decoded incrementally and split like shingleLine() splits the lines of
+a file opened in text mode: str.split() whitespace (including no-break spaces)
+between words, and universal newlines (\n, \r\n or a bare \r) between lines.
+Documents larger than a size limit are reduced to a bottom-k sketch, the k
+smallest hashes of each width's shingles, instead of full shingle sets.
+'''
+
+import codecs
+import fnmatch
+import heapq
+import io
+import mmap
+import os
+from array import array
+from collections import deque
+
+from . import shingle_hash
+
+HUGE_DOCUMENT_BYTES = 64 << 20 #documents above this size are sketched instead of fully shingled
+SKETCH_SIZE = 1 << 16 #hashes kept per width in the sketch of a huge document
+
+READ_CHUNK = 1 << 20 #bytes of the memory map decoded at a time
+
+def discoverFiles(roots, pattern='*txt', recursive=True):
+    '''returns the sorted paths of files matching pattern under the given files and directories'''
+    found = set()
+    for root in roots:
+        if os.path.isfile(root):
+            found.add(root)
+            continue
+        for folder, subfolders, names in os.walk(root):
+            if not recursive:
+                subfolders[:] = []
+            subfolders.sort()
+            for name in fnmatch.filter(names, pattern):
+                found.add(os.path.normpath(os.path.join(folder, name)))
+    return sorted(found)
+
+def iterTextTokens(chunks):
+    '''
+    yields the lowercase words of UTF-8 text given as byte chunks, with None marking each line break;
+    a word or a \r\n split across two chunks is carried over to the next one
+    '''
+    decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder('utf-8')('replace'), translate=True)
+    partial = ''
+    for chunk, final in chunks:
+        lines = (partial + decoder.decode(chunk, final)).split('\n')
+        for line in lines[:-1]:
+            for word in line.split():
+                yield word.lower()
+            yield None
+        last = lines[-1]
+        words = last.split()
+        partial = words.pop() if words and not final and not last[-1].isspace() else ''
+        for word in words:
+            yield word.lower()
+
+def byteChunks(data, size=READ_CHUNK):
+    '''yields (chunk, is last chunk) for consecutive slices of a bytes-like object'''
+    for start in range(0, len(data), size):
+        yield data[start:start + size], start + size >= len(data)
+
+assert list(iterTextTokens(byteChunks(b'One\xc2\xa0two  three\rfour five\r\nsix', 4))) == ['one', 'two', 'three', None, 'four', 'five', None, 'six']
+assert list(iterTextTokens(byteChunks(b'a\r', 2))) + list(iterTextTokens(byteChunks(b'a\r\nb\n', 2))) == ['a', None, 'a', None, 'b', None]
+
+def iterTokens(path):
+    '''yields the lowercase words of a file, read through a memory map, with None marking each line break'''
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield from iterTextTokens(byteChunks(data))
+
+def iterShingles(tokens, widths, spanLines=False):
+    '''yields (width, shingle) for every w-gram of a token stream from iterTokens(), keeping only the longest window'''
+    longest = max(widths)
+    window = deque(maxlen=longest)
+    for token in tokens:
+        if token is None:
+            if not spanLines:
+                window.clear()
+            continue
+        window.append(token)
+        for w in widths:
+            if len(window) >= w:
+                yield w, tuple(window)[-w:]
+
+def streamShingles(path, widths, spanLines=False, hashed=False):
+    '''returns {width: shingle set} for a file (or sorted hash arrays when hashed) in a single memory-mapped pass'''
+    widths = tuple(widths)
+    shingled = {w: set() for w in widths}
+    for w, shingle in iterShingles(iterTokens(path), widths, spanLines):
+        shingled[w].add(shingle)
+    if hashed:
+        for w in widths:
+            shingled[w] = shingle_hash.hashedShingles(shingled[w])
+    return shingled
+
+def streamSketch(path, widths, spanLines=False, size=SKETCH_SIZE):
+    '''
+    returns {width: sorted hash array} holding the size smallest distinct shingle hashes of each width;
+    besides the read chunk, at most size hashes per width are held (a few MB each), whatever the file size
+    '''
+    widths = tuple(widths)
+    heaps = {w: [] for w in widths} #negated hashes, so the largest kept hash is on top
+    kept = {w: set() for w in widths}
+    for w, shingle in iterShingles(iterTokens(path), widths, spanLines):
+        h = shingle_hash.shingleHash(shingle)
+        heap = heaps[w]
+        if h in kept[w] or (len(heap) == size and h >= -heap[0]):
+            continue
+        kept[w].add(h)
+        if len(heap) < size:
+            heapq.heappush(heap, -h)
+        else:
+            kept[w].discard(-heapq.heapreplace(heap, -h))
+    return {w: array('Q', sorted(kept[w])) for w in widths}
+
+def ingestReport(files, size, seconds):
+    '''returns a one-line summary of how fast the corpus was read and shingled'''
+    megabytes = size / (1 << 20)
+    rate = megabytes / seconds if seconds > 0 else 0
+    return "Read {} file(s), {:.2f} MB in {:.2f} s ({:.2f} MB/s)".format(files, megabytes, seconds, rate)
@@ -0,0 +1,68 @@
+'''
+Inverted shingle index for checking one document against an indexed corpus
+Maps each shingle hash to the posting list of documents that contain it, per
+shingle width. A query only visits the posting lists of its own shingles, so
+documents that share nothing with it are never touched.
+'''
+
+import heapq
+from array import array
+
+def buildInvertedIndex(documents):
+    '''
+    returns an inverted index built from documents, a dict of name -> {width: sorted hash array}
+    (the hashed shingleCorpus() / index fingerprint format)
+    '''
+    names = []
+    sizes = {}
+    postings = {}
+    for docId, (name, fingerprints) in enumerate(documents.items()):
+        names.append(name)
+        for width, hashes in fingerprints.items():
+            sizes.setdefault(width, {})[docId] = len(hashes)
+            widthPostings = postings.setdefault(width, {})
+            for h in hashes:
+                if h in widthPostings:
+                    widthPostings[h].append(docId)
+                else:
+                    widthPostings[h] = array('I', [docId])
+    return {'names': names, 'sizes': sizes, 'postings': postings}
+
+def queryInvertedIndex(index, fingerprints, k=10, exclude=None):
+    '''
+    returns up to k (name, min, max, avg) similarity tuples for the indexed documents most similar to fingerprints,
+    ranked by average Jacquard's Similarity Index over the widths; exclude skips a document name (e.g. the query itself)
+    '''
+    widths = sorted(fingerprints)
+    common = {}
+    for width in widths:
+        widthPostings = index['postings'].get(width, {})
+        for h in fingerprints[width]:
+            for docId in widthPostings.get(h, ()):
+                counts = common.get(docId)
+                if counts is None:
+                    counts = common[docId] = dict.fromkeys(widths, 0)
+                counts[width] = counts[width] + 1
+    names = index['names']
+    sizes = {names[docId]: {width: index['sizes'][width][docId] for width in widths} for docId in common}
+    return rankMatches(fingerprints, {names[docId]: counts for docId, counts in common.items()}, sizes, k, exclude)
+
+def rankMatches(fingerprints, common, sizes, k=10, exclude=None):
+    '''
+    returns the k best (name, min, max, avg) tuples from common, {name: {width: hashes shared with fingerprints}},
+    and sizes, {name: {width: number of hashes}}; widths a document shares nothing at count as 0
+    '''
+    widths = sorted(fingerprints)
+    matches = []
+    for name, counts in common.items():
+        if name == exclude:
+            continue
+        similarity = []
+        for width in widths:
+            shared = counts.get(width, 0)
+            union = len(fingerprints[width]) + sizes[name].get(width, 0) - shared
+            similarity.append(shared / union if union else 0)
+        matches.append((name, round(min(similarity), 3), round(max(similarity), 3), round(sum(similarity) / len(similarity), 3)))
+    return heapq.nsmallest(k, matches, key=lambda match: (-match[3], match[0]))
+
+assert queryInvertedIndex(buildInvertedIndex({'a': {2: array('Q', [1, 2, 3])}, 'b': {2: array('Q', [7])}}), {2: array('Q', [1, 2, 4])}) == [('a', 0.5, 0.5, 0.5)]
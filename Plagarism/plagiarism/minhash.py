@@ -0,0 +1,103 @@
+'''
+MinHash signatures and banded LSH index for the Plagiarism Detector
+Only pairs of documents that share at least one LSH bucket are handed back as
+candidates, so the exact Jaccard comparison can skip pairs that are very unlikely
+to be similar. Signatures are computed with numpy, all permutations of a block of
+hashes at once, using 64-bit modular arithmetic that cannot overflow.
+'''
+
+import random
+from itertools import combinations
+
+import numpy as np
+
+from .shingle_hash import shingleHash
+
+MERSENNE_PRIME = (1 << 61) - 1 #modulus for the universal hash family
+MAX_HASH = (1 << 64) - 1
+BLOCK_VALUES = 1 << 20 #permutation x hash products computed at a time, to bound the temporary arrays
+LOW32 = np.uint64((1 << 32) - 1)
+LOW29 = np.uint64((1 << 29) - 1)
+PRIME = np.uint64(MERSENNE_PRIME)
+
+def hashPermutations(numPerm, seed=1):
+    '''returns numPerm (a, b) coefficient pairs defining the hash functions (a*x + b) mod p used as permutations'''
+    generator = random.Random(seed)
+    return [(generator.randint(1, MERSENNE_PRIME - 1), generator.randint(0, MERSENNE_PRIME - 1)) for perm in range(numPerm)]
+
+def minhashSignature(shingles, perms):
+    '''returns the MinHash signature (one minimum per permutation) of a shingle set'''
+    return hashedMinhashSignature([shingleHash(shingle) for shingle in shingles], perms)
+
+def reduceMersenne(values):
+    '''returns values (uint64 below 2^64) modulo MERSENNE_PRIME, using 2^61 = 1 mod the prime'''
+    values = (values & PRIME) + (values >> np.uint64(61))
+    values = (values & PRIME) + (values >> np.uint64(61))
+    return np.where(values >= PRIME, values - PRIME, values)
+
+def mulModMersenne(x, y):
+    '''returns x * y modulo MERSENNE_PRIME for uint64 arrays below the prime, from 32-bit halves so no product overflows'''
+    x1, x0 = x >> np.uint64(32), x & LOW32
+    y1, y0 = y >> np.uint64(32), y & LOW32
+    middle = x1 * y0 + x0 * y1 #below 2^62; middle * 2^32 = (middle >> 29) * 2^61 + (middle & LOW29) * 2^32
+    total = (x1 * y1 << np.uint64(3)) + (middle >> np.uint64(29)) + ((middle & LOW29) << np.uint64(32)) + reduceMersenne(x0 * y0)
+    return reduceMersenne(total)
+
+def hashedMinhashSignature(hashes, perms):
+    '''returns the MinHash signature of shingles that are already hashed to integers'''
+    if not len(hashes):
+        return tuple([MAX_HASH] * len(perms))
+    a = np.array([perm[0] for perm in perms], dtype=np.uint64)[:, np.newaxis]
+    b = np.array([perm[1] for perm in perms], dtype=np.uint64)[:, np.newaxis]
+    values = reduceMersenne(np.asarray(hashes, dtype=np.uint64))
+    block = max(1, BLOCK_VALUES // len(perms))
+    signature = np.full(len(perms), MERSENNE_PRIME, dtype=np.uint64)
+    for start in range(0, len(values), block):
+        permuted = reduceMersenne(mulModMersenne(a, values[np.newaxis, start:start + block]) + b)
+        np.minimum(signature, permuted.min(axis=1), out=signature)
+    return tuple(signature.tolist())
+
+assert hashedMinhashSignature([0, 5, MAX_HASH, MERSENNE_PRIME + 3], hashPermutations(4)) == tuple(
+    min((a * h + b) % MERSENNE_PRIME for h in [0, 5, MAX_HASH, MERSENNE_PRIME + 3]) for a, b in hashPermutations(4))
+
+def estimatedSimilarity(signature1, signature2):
+    '''estimates Jacquard's Similarity Index as the fraction of matching signature slots'''
+    matches = sum(1 for x, y in zip(signature1, signature2) if x == y)
+    return matches / len(signature1)
+
+assert estimatedSimilarity((1,2,3,4),(1,2,3,4)) == 1
+assert estimatedSimilarity((1,2,3,4),(1,0,3,0)) == 0.5
+
+def candidatePairs(signatures, bands, rows):
+    '''
+    returns the pairs of document names whose signatures collide in at least one LSH band
+    signatures is a dict of document name -> MinHash signature; pairs follow the order of the dict keys
+    '''
+    names = list(signatures)
+    if not names:
+        return []
+    if bands * rows > len(signatures[names[0]]):
+        raise ValueError("bands * rows must not exceed the number of permutations")
+    order = {name: position for position, name in enumerate(names)}
+    found = set()
+    for band in range(bands):
+        buckets = {}
+        for name in names:
+            key = signatures[name][band * rows:(band + 1) * rows]
+            buckets.setdefault(key, []).append(name)
+        for bucket in buckets.values():
+            for pair in combinations(bucket, 2):
+                found.add(pair)
+    return sorted(found, key=lambda pair: (order[pair[0]], order[pair[1]]))
+
+assert candidatePairs({'a':(1,2,3,4),'b':(1,2,9,9),'c':(7,7,7,7)},2,2) == [('a','b')]
+
+def collisionProbability(similarity, bands, rows):
+    '''returns the probability that two documents with the given similarity become a candidate pair'''
+    return 1 - (1 - similarity ** rows) ** bands
+
+def pruningReport(totalPairs, candidates):
+    '''returns a one-line summary of how many pairs the LSH index pruned'''
+    pruned = totalPairs - candidates
+    percent = 100 * pruned / totalPairs if totalPairs else 0
+    return "LSH kept {} of {} pair(s), pruned {} ({:.1f}%)".format(candidates, totalPairs, pruned, percent)
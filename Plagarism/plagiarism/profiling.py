@@ -0,0 +1,92 @@
+'''
+Per-stage timing and counters for the Plagiarism Detector
+Stages can be nested; each stage is charged its own (self) time only, so the
+stage times of a run add up to the time spent inside the pipeline.
+'''
+
+import json
+import time
+from contextlib import contextmanager
+
+class Profile:
+    '''records wall time and call counts per stage, plus named counters'''
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.counters = {}
+        self.events = []
+        self.active = []
+
+    def enter(self, name):
+        '''starts timing a stage (use stage() unless the stage spans a generator)'''
+        self.active.append([name, time.perf_counter(), 0.0])
+
+    def leave(self):
+        '''stops timing the innermost stage and charges its self time'''
+        name, start, children = self.active.pop()
+        elapsed = time.perf_counter() - start
+        seconds, calls = self.stages.get(name, (0.0, 0))
+        self.stages[name] = (seconds + elapsed - children, calls + 1)
+        if self.active:
+            self.active[-1][2] = self.active[-1][2] + elapsed
+        return start, elapsed
+
+    @contextmanager
+    def stage(self, name):
+        '''times the enclosed block as one call of the named stage and records it in the trace'''
+        self.enter(name)
+        try:
+            yield
+        finally:
+            start, elapsed = self.leave()
+            self.events.append({'stage': name, 'start': round(start - self.started, 6), 'seconds': round(elapsed, 6)})
+
+    def timedIter(self, name, items, counter=None):
+        '''yields the items of an iterable, charging the time spent producing them to the named stage and counting them'''
+        items = iter(items)
+        while True:
+            self.enter(name)
+            try:
+                item = next(items)
+            except StopIteration:
+                self.leave()
+                return
+            self.leave()
+            if counter:
+                self.count(counter)
+            yield item
+
+    def count(self, name, amount=1):
+        '''adds amount to the named counter'''
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def summary(self):
+        '''returns the stage times and counters as printable text'''
+        total = sum(seconds for seconds, calls in self.stages.values())
+        lines = ["{:<14}{:>10}{:>12}{:>8}".format('Stage', 'Calls', 'Seconds', 'Share')]
+        for name, (seconds, calls) in self.stages.items():
+            share = 100 * seconds / total if total else 0
+            lines.append("{:<14}{:>10}{:>12.4f}{:>7.1f}%".format(name, calls, seconds, share))
+        lines.append("{:<14}{:>10}{:>12.4f}".format('total', '', total))
+        if self.counters:
+            lines.append("")
+            lines.append("{:<30}{:>14}".format('Counter', 'Value'))
+            for name in sorted(self.counters):
+                lines.append("{:<30}{:>14}".format(name, self.counters[name]))
+        return "\n".join(lines)
+
+    def trace(self):
+        '''returns the profile as a JSON-serializable dict'''
+        return {
+            'stages': {name: {'seconds': round(seconds, 6), 'calls': calls} for name, (seconds, calls) in self.stages.items()},
+            'counters': dict(self.counters),
+            'events': self.events,
+        }
+
+    def dumpJson(self, path, **extra):
+        '''writes the trace, plus any extra fields such as the command line, to a JSON file'''
+        trace = self.trace()
+        trace.update(extra)
+        with open(path, 'w') as file:
+            json.dump(trace, file, indent=2)
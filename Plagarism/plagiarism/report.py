@@ -0,0 +1,36 @@
+'''
+Table reports for the Plagiarism Detector (texttable is only imported when a report is drawn)
+'''
+
+from . import winnowing
+
+def drawReport(fileData,out=None):
+    '''prints the plagiarism report in a table format with the rows from Detector.analyze(), to out (default: the screen)'''
+    import texttable as tt
+    tab = tt.Texttable()
+    tableItems = [[]]
+    for row in fileData:
+        tableItems.append(row)
+    tab.add_rows(tableItems)
+    tab.set_cols_align(['c']*6)
+    tab.header(['File 1','File 2','Min.','Max.','Avg. Similarity','Status'])
+    print(tab.draw(),file=out)
+
+def drawQueryReport(queryFile,matches,status,out=None):
+    '''prints the best matches from Detector.query() in a table format to out; status maps (min, max, avg) to a status tuple'''
+    import texttable as tt
+    tab = tt.Texttable()
+    tab.add_rows([[]] + [match + status(match[1:]) for match in matches])
+    tab.set_cols_align(['c']*5)
+    tab.header(['Indexed File','Min.','Max.','Avg. Similarity','Status'])
+    print("Best matches for",queryFile,file=out)
+    print(tab.draw(),file=out)
+
+def drawWinnowReport(fileData,out=None):
+    '''prints the winnowing report in a table format to out, with the lines of the passages each pair shares'''
+    import texttable as tt
+    tab = tt.Texttable()
+    tab.add_rows([[]] + [row[:4] + (winnowing.describePassages(row[4]),) for row in fileData])
+    tab.set_cols_align(['c']*5)
+    tab.header(['File 1','File 2','Fingerprint Similarity','Status','Matching Lines'])
+    print(tab.draw(),file=out)
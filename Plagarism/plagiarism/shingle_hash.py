@@ -0,0 +1,88 @@
+'''
+Compact hashed-integer shingle representation for the Plagiarism Detector
+Every w-gram is hashed to a 64-bit integer and a document is kept as a sorted,
+deduplicated array('Q') (8 bytes per shingle instead of a tuple of strings).
+Jacquard's Similarity Index then only needs the intersection size of two sorted
+buffers, found with one numpy binary search of the smaller buffer in the larger.
+'''
+
+import hashlib
+from array import array
+
+import numpy as np
+
+def shingleHash(shingle):
+    '''returns a stable 64-bit integer hash for a shingle (tuple of words), identical across runs and processes'''
+    data = ' '.join(shingle).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+assert shingleHash(('here','is','a')) == shingleHash(('here','is','a'))
+assert shingleHash(('here','is','a')) != shingleHash(('is','a','test'))
+
+def hashedShingles(shingles):
+    '''returns the shingles of a set (or any iterable) as a sorted, deduplicated array of 64-bit hashes'''
+    return array('Q', sorted({shingleHash(shingle) for shingle in shingles}))
+
+def mergeCounts(hashes1, hashes2):
+    '''returns (intersection size, union size) of two sorted, deduplicated hash arrays'''
+    len1 = len(hashes1)
+    len2 = len(hashes2)
+    if len1 == 0 or len2 == 0:
+        return 0, len1 + len2
+    if len1 > len2:
+        hashes1, hashes2 = hashes2, hashes1
+    small = np.frombuffer(hashes1, dtype=np.uint64)
+    large = np.frombuffer(hashes2, dtype=np.uint64)
+    positions = np.minimum(large.searchsorted(small), len(large) - 1)
+    common = int(np.count_nonzero(large[positions] == small))
+    return common, len1 + len2 - common
+
+assert mergeCounts(array('Q',[1,2,4]),array('Q',[2,4,5])) == (2,4)
+assert mergeCounts(array('Q',[]),array('Q',[3])) == (0,1)
+
+def hashedSimilarityIndex(hashes1, hashes2):
+    '''computes Jacquard's Similarity Index between two sorted hash arrays, 0 when both are empty'''
+    common, union = mergeCounts(hashes1, hashes2)
+    if union == 0:
+        return 0.0
+    return common / union
+
+assert hashedSimilarityIndex(array('Q',[1,2,3]),array('Q',[1,2,3])) == 1
+assert hashedSimilarityIndex(array('Q',[1,2,3]),array('Q',[4,5,6])) == 0
+assert hashedSimilarityIndex(array('Q',[1,2,4]),array('Q',[2,4,5])) == 0.5
+assert hashedSimilarityIndex(array('Q',[]),array('Q',[])) == 0
+
+def bottomSketch(shingles, size):
+    '''returns the size smallest hashes of a shingle set or sorted hash array, as a sorted hash array'''
+    hashes = shingles if isinstance(shingles, array) else hashedShingles(shingles)
+    return hashes[:size]
+
+def sketchSimilarityIndex(sketch1, sketch2, size):
+    '''
+    estimates Jacquard's Similarity Index of two documents from their bottom-size sketches: the share of
+    the size smallest hashes of their union that both contain (exact when the union has at most size hashes)
+    '''
+    if len(sketch1) == 0 or len(sketch2) == 0:
+        return 0.0
+    hashes1 = np.frombuffer(sketch1, dtype=np.uint64)
+    hashes2 = np.frombuffer(sketch2, dtype=np.uint64)
+    union = np.union1d(hashes1, hashes2)[:size]
+    cutoff = union[-1]
+    common, _ = mergeCounts(sketch1[:int(hashes1.searchsorted(cutoff, 'right'))], sketch2[:int(hashes2.searchsorted(cutoff, 'right'))])
+    return common / len(union)
+
+assert sketchSimilarityIndex(array('Q',[1,2,4]),array('Q',[2,4,5]),10) == 0.5
+assert sketchSimilarityIndex(array('Q',[1,2,4]),array('Q',[2,4,5]),2) == 0.5
+assert sketchSimilarityIndex(array('Q',[]),array('Q',[]),2) == 0
+
+def collisionReport(shingleSets):
+    '''
+    returns (distinct shingles, distinct hashes, collision rate) over an iterable of shingle sets
+    the rate is the fraction of distinct shingles that share a hash with another shingle
+    '''
+    distinct = set()
+    for shingles in shingleSets:
+        distinct.update(shingles)
+    hashes = {shingleHash(shingle) for shingle in distinct}
+    rate = (len(distinct) - len(hashes)) / len(distinct) if distinct else 0
+    return len(distinct), len(hashes), rate
@@ -0,0 +1,106 @@
+'''
+Shingling and Jacquard's Similarity Index for the Plagiarism Detector
+'''
+
+from . import shingle_hash
+
+SHINGLE_LOW_RANGE = 2
+SHINGLE_HIGH_RANGE = 5
+
+def shingleLine(line,w):
+    '''returns a w-width shingle set for a single line of lowercase text'''
+    line = line.lower()
+    shingle = []
+    start = 0
+    end = w
+    word = tuple(line.split())
+    for window in range(len(word)-w + 1):
+        shingle.append(word[start:end])
+        start = start + 1
+        end = end + 1
+    return set(shingle)
+
+assert len(shingleLine("here is a test to run",3)) == 4
+assert len(shingleLine("test this please",3)) == 1
+assert len(shingleLine("test this one please",2)) == 3
+
+def shingleWords(lines,widths,spanLines=False):
+    '''returns a dict of width -> shingle set for lines of text, built in a single sweep over their words'''
+    longest = max(widths)
+    shingled = {w: set() for w in widths}
+    window = ()
+    for line in lines:
+        if not spanLines:
+            window = ()
+        for word in line.lower().split():
+            window = (window + (word,))[-longest:]
+            for w in widths:
+                if len(window) >= w:
+                    shingled[w].add(window[-w:])
+    return shingled
+
+assert shingleWords(["here is a test to run"],(2,3))[3] == shingleLine("here is a test to run",3)
+assert shingleWords(["here is a test to run"],(2,3))[2] == shingleLine("here is a test to run",2)
+assert len(shingleWords(["test this","one please"],(2,),False)[2]) == 2
+assert len(shingleWords(["test this","one please"],(2,),True)[2]) == 3
+
+def shingleFileWidths(file,widths,spanLines=False):
+    '''returns a dict of width -> shingle set for an entire file, reading and tokenizing it only once'''
+    with open(file,'r') as file:
+        return shingleWords(file,tuple(widths),spanLines)
+
+def shingleFile(file,w,spanLines=False):
+    '''returns a w-width shingle set for an entire file'''
+    if spanLines:
+        return shingleFileWidths(file,(w,),spanLines)[w]
+    with open(file,'r') as file:
+        shingledSet = set()
+        for line in file:
+            shingled = shingleLine(line,w)
+            shingledSet = shingledSet | shingled
+        return shingledSet
+
+def hashedShingleLine(line,w):
+    '''returns the shingles of a single line of text as a sorted array of 64-bit hashes'''
+    return shingle_hash.hashedShingles(shingleLine(line,w))
+
+assert len(hashedShingleLine("here is a test to run",3)) == 4
+
+def hashedShingleFile(file,w,spanLines=False):
+    '''returns the shingles of an entire file as a sorted array of 64-bit hashes'''
+    return shingle_hash.hashedShingles(shingleFile(file,w,spanLines))
+
+def similarityIndex(set1,set2):
+    '''computes Jacquard's Similarity Index between two sets of data, 0 when both are empty'''
+    union = len(set1 | set2)
+    if union == 0:
+        return 0.0
+    similarity = (len(set1 & set2))/union
+    return similarity
+
+assert (similarityIndex({1,2,3},{1,2,3})) == 1
+assert (similarityIndex({1,2,3},{4,5,6})) == 0
+assert (similarityIndex({1,2,4},{4,5,2})) == 0.5
+assert (similarityIndex(set(),set())) == 0
+
+def shingleSimilarityIndex(shingles1,shingles2):
+    '''computes Jacquard's Similarity Index for either shingle representation (sets or sorted hash arrays)'''
+    if isinstance(shingles1,set):
+        return similarityIndex(shingles1,shingles2)
+    return shingle_hash.hashedSimilarityIndex(shingles1,shingles2)
+
+assert shingleSimilarityIndex(set(),set()) == shingleSimilarityIndex(hashedShingleLine("too short",3),hashedShingleLine("",3)) == 0
+
+def computeFileSimilarity(file1,file2,w,spanLines=False):
+    ''' returns Jacquard's Similary Index between two files'''
+    setFile1 = shingleFile(file1,w,spanLines)
+    setFile2 = shingleFile(file2,w,spanLines)
+    return similarityIndex(setFile1,setFile2)
+
+def roundedStats(similarity):
+    '''returns min, max and avg of a list of similarities, rounded to 3 decimals'''
+    return round(min(similarity),3), round(max(similarity),3), round(sum(similarity)/len(similarity),3)
+
+def similarityStats(file1,file2,widths=range(SHINGLE_LOW_RANGE,SHINGLE_HIGH_RANGE),spanLines=False):
+    '''returns a list containing min, max and avg similarity of two files given set shingle range, rounded to 3 decimals'''
+    return roundedStats([computeFileSimilarity(file1,file2,w,spanLines) for w in widths])
@@ -0,0 +1,63 @@
+'''
+Vectorized all-pairs Jacquard's Similarity Index through a sparse document x shingle matrix
+One sparse matrix product gives the intersection size of every pair of documents,
+the union follows from the shingle counts, and the min/max/avg over the shingle
+widths are taken on the whole similarity matrices at once.
+Requires numpy and scipy.
+'''
+
+import numpy as np
+from scipy import sparse
+
+from .shingle_hash import shingleHash
+
+def hashArray(shingles):
+    '''returns a shingle set or sorted hash array as a numpy uint64 array of hashes'''
+    if isinstance(shingles, set):
+        return np.fromiter((shingleHash(shingle) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+    return np.frombuffer(shingles, dtype=np.uint64)
+
+def documentShingleMatrix(shingleSets):
+    '''returns a sparse binary matrix with one row per document and one column per distinct shingle'''
+    hashes = [np.unique(hashArray(shingles)) for shingles in shingleSets]
+    sizes = np.array([len(h) for h in hashes], dtype=np.int64)
+    allHashes = np.concatenate(hashes) if hashes else np.array([], dtype=np.uint64)
+    vocabulary, columns = np.unique(allHashes, return_inverse=True)
+    rows = np.repeat(np.arange(len(hashes)), sizes)
+    data = np.ones(len(columns), dtype=np.int32)
+    return sparse.csr_matrix((data, (rows, columns.ravel())), shape=(len(hashes), len(vocabulary)))
+
+def jaccardMatrix(shingleSets):
+    '''returns the dense n x n matrix of Jacquard's Similarity Index between every pair of n shingle sets'''
+    matrix = documentShingleMatrix(shingleSets)
+    intersection = (matrix @ matrix.T).toarray().astype(np.float64)
+    sizes = np.asarray(matrix.sum(axis=1), dtype=np.float64).ravel()
+    union = sizes[:, None] + sizes[None, :] - intersection
+    similarity = np.zeros_like(intersection)
+    np.divide(intersection, union, out=similarity, where=union > 0)
+    return similarity
+
+assert jaccardMatrix([{('a',), ('b',), ('d',)}, {('d',), ('e',), ('b',)}])[0, 1] == 0.5
+
+def similarityStatsMatrices(corpus, files, widths):
+    '''returns the (min, max, avg) similarity matrices of files over the given shingle widths, corpus as built by shingleCorpus()'''
+    total = None
+    low = None
+    high = None
+    for w in widths:
+        similarity = jaccardMatrix([corpus[file][w] for file in files])
+        if total is None:
+            total = similarity.copy()
+            low = similarity.copy()
+            high = similarity.copy()
+        else:
+            total += similarity
+            np.minimum(low, similarity, out=low)
+            np.maximum(high, similarity, out=high)
+    return low, high, total / len(widths)
+
+def pairStats(files, low, high, avg):
+    '''yields (file 1, file 2, min, max, avg) for every pair in combinations(files, 2) order, rounded to 3 decimals'''
+    first, second = np.triu_indices(len(files), k=1)
+    for i, j in zip(first.tolist(), second.tolist()):
+        yield files[i], files[j], round(float(low[i, j]), 3), round(float(high[i, j]), 3), round(float(avg[i, j]), 3)
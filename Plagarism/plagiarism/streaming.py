@@ -0,0 +1,63 @@
+'''
+Streaming machine-readable output for the Plagiarism Detector
+Rows from Detector.iterAnalyze() are written as CSV or JSON lines while they are
+produced, optionally filtered by a score floor or reduced to the best matches
+of each document, so huge result sets never have to be held in memory.
+'''
+
+import csv
+import heapq
+import json
+
+FIELDS = ('file1','file2','min','max','avg','status')
+
+def countStatus(rows,counts):
+    '''passes rows through unchanged while counting them and their statuses into the counts dict'''
+    for row in rows:
+        counts['pairs'] = counts.get('pairs',0) + 1
+        counts[row[5]] = counts.get(row[5],0) + 1
+        yield row
+
+def aboveFloor(rows,floor):
+    '''yields only the rows whose average similarity is at least floor'''
+    for row in rows:
+        if row[4] >= floor:
+            yield row
+
+assert list(aboveFloor([('a','b',0,0,0.2,'x'),('a','c',0,0,0.7,'y')],0.5)) == [('a','c',0,0,0.7,'y')]
+
+def topPerDocument(rows,k):
+    '''
+    returns the rows that are among the k best (highest average similarity) of either of their documents,
+    in their original order; memory is bounded by k rows per document
+    '''
+    best = {}
+    for position, row in enumerate(rows):
+        entry = (row[4],-position,row)
+        for file in row[:2]:
+            heap = best.setdefault(file,[])
+            if len(heap) < k:
+                heapq.heappush(heap,entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap,entry)
+    kept = {}
+    for heap in best.values():
+        for avg, position, row in heap:
+            kept[-position] = row
+    return [kept[position] for position in sorted(kept)]
+
+assert topPerDocument([('a','b',0,0,0.2,'x'),('a','c',0,0,0.7,'y'),('b','c',0,0,0.1,'z')],1) == [('a','b',0,0,0.2,'x'),('a','c',0,0,0.7,'y')]
+
+def writeCsv(rows,out):
+    '''writes a header and one CSV line per row to the open text file out'''
+    writer = csv.writer(out)
+    writer.writerow(FIELDS)
+    for row in rows:
+        writer.writerow(row)
+
+def writeJsonl(rows,out):
+    '''writes one JSON object per row to the open text file out'''
+    for row in rows:
+        out.write(json.dumps(dict(zip(FIELDS,row))) + "\n")
+
+WRITERS = {'csv': writeCsv, 'jsonl': writeJsonl}
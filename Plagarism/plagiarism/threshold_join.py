@@ -0,0 +1,76 @@
+'''
+Threshold join for the Plagiarism Detector
+Finds the file pairs whose average similarity over the shingle widths can still
+exceed the plagiarism threshold, using two standard Jaccard bounds:
+- size filter: J(A,B) <= min(|A|,|B|) / max(|A|,|B|)
+- prefix filter: if J(A,B) >= t, then with shingles sorted in one global order the
+  first |A| - ceil(t*|A|) + 1 shingles of A and of B share at least one shingle
+An average above t needs at least one width above t, so a pair is only kept if it
+passes the prefix filter at some width and its average size bound exceeds t.
+Every pruned pair provably scores at or below the threshold.
+'''
+
+import math
+
+def prefixLength(size, threshold):
+    '''returns how many of a set's first shingles (in global order) must be probed to find every set with Jaccard >= threshold'''
+    if size == 0:
+        return 0
+    return size - math.ceil(threshold * size - 1e-9) + 1
+
+assert prefixLength(10, 0.55) == 5
+assert prefixLength(20, 0.55) == 10
+assert prefixLength(0, 0.55) == 0
+
+def sizeBound(size1, size2):
+    '''returns the largest Jacquard's Similarity Index two sets of these sizes can reach'''
+    if size1 == 0 and size2 == 0:
+        return 0
+    return min(size1, size2) / max(size1, size2)
+
+assert sizeBound(5, 10) == 0.5
+
+def prefixCandidates(shingleSets, threshold):
+    '''returns the set of index pairs (i, j), i < j, whose shingle sets pass the size and prefix filters for threshold'''
+    frequency = {}
+    for shingles in shingleSets:
+        for shingle in shingles:
+            frequency[shingle] = frequency.get(shingle, 0) + 1
+    ordered = [sorted(shingles, key=lambda shingle: (frequency[shingle], shingle)) for shingles in shingleSets]
+    index = {}
+    candidates = set()
+    for doc in sorted(range(len(ordered)), key=lambda doc: (len(ordered[doc]), doc)):
+        size = len(ordered[doc])
+        prefix = ordered[doc][:prefixLength(size, threshold)]
+        for shingle in prefix:
+            for other in index.get(shingle, ()):
+                if len(ordered[other]) >= threshold * size:
+                    candidates.add((min(doc, other), max(doc, other)))
+        for shingle in prefix:
+            index.setdefault(shingle, []).append(doc)
+    return candidates
+
+assert prefixCandidates([{1, 2, 3}, {1, 2, 3}, {7, 8, 9}], 0.55) == {(0, 1)}
+
+def thresholdCandidatePairs(corpus, files, widths, threshold):
+    '''
+    returns the file pairs (in combinations(files, 2) order) whose average similarity over widths may exceed threshold,
+    corpus as built by shingleCorpus()
+    '''
+    files = list(files)
+    widths = list(widths)
+    candidates = set()
+    for w in widths:
+        candidates |= prefixCandidates([corpus[file][w] for file in files], threshold)
+    pairs = []
+    for i, j in sorted(candidates):
+        bound = sum(sizeBound(len(corpus[files[i]][w]), len(corpus[files[j]][w])) for w in widths) / len(widths)
+        if bound > threshold:
+            pairs.append((files[i], files[j]))
+    return pairs
+
+def joinReport(totalPairs, candidates):
+    '''returns a one-line summary of how many pairs the threshold join pruned'''
+    pruned = totalPairs - candidates
+    percent = 100 * pruned / totalPairs if totalPairs else 0
+    return "Threshold join scored {} of {} pair(s), pruned {} ({:.1f}%) that cannot reach the threshold".format(candidates, totalPairs, pruned, percent)
@@ -0,0 +1,122 @@
+'''
+Winnowing fingerprints (Schleimer, Wilkerson and Aiken, as used by MOSS)
+Every k-word shingle is hashed, and only the minimum hash of each window of
+consecutive hashes is kept together with its position. That keeps roughly
+2/(window+1) of the shingles, and any passage shared by two documents that is
+at least window + k - 1 words long is guaranteed to share a fingerprint.
+Positions are kept so the report can point at the matching lines.
+'''
+
+from collections import deque
+
+from .shingle_hash import shingleHash
+
+def documentWords(lines):
+    '''returns (words, line numbers) for lines of text: the lowercase words and the 1-based line each word is on'''
+    words = []
+    lineNumbers = []
+    for number, line in enumerate(lines, 1):
+        for word in line.lower().split():
+            words.append(word)
+            lineNumbers.append(number)
+    return words, lineNumbers
+
+class Winnower:
+    '''
+    Robust winnowing fed one hash at a time: selects the rightmost minimum of each window of hashes,
+    each recorded once, while keeping only the current window in memory
+    '''
+
+    def __init__(self, window):
+        self.window = window
+        self.recent = deque(maxlen=window)
+        self.chosen = None
+        self.position = -1
+
+    def push(self, h):
+        '''adds the next hash and returns the (position, hash) it causes to be selected, or None'''
+        self.position = self.position + 1
+        self.recent.append((self.position, h))
+        if len(self.recent) < self.window:
+            return None
+        if self.chosen is None or self.chosen[0] <= self.position - self.window:
+            self.chosen = self.recent[0]
+            for entry in self.recent:
+                if entry[1] <= self.chosen[1]:
+                    self.chosen = entry
+            return self.chosen
+        if h < self.chosen[1]:
+            self.chosen = (self.position, h)
+            return self.chosen
+        return None
+
+    def finish(self):
+        '''returns the (position, hash) selected for a stream shorter than one window, or None'''
+        if self.chosen is None and self.recent:
+            low = min(h for position, h in self.recent)
+            return max(entry for entry in self.recent if entry[1] == low)
+        return None
+
+def winnowStream(hashes, window):
+    '''yields (position, hash) for every position robust winnowing selects from an iterable of hashes'''
+    winnower = Winnower(window)
+    for h in hashes:
+        selected = winnower.push(h)
+        if selected is not None:
+            yield selected
+    selected = winnower.finish()
+    if selected is not None:
+        yield selected
+
+def winnow(hashes, window):
+    '''returns the positions selected by robust winnowing: the rightmost minimum of each window of hashes, each recorded once'''
+    return [position for position, h in winnowStream(hashes, window)]
+
+assert winnow([77, 74, 42, 17, 98, 50, 17, 98, 8, 88, 67, 39, 77, 74, 42, 17, 98], 4) == [3, 6, 8, 11, 15]
+
+def fingerprintLines(lines, k, window):
+    '''returns the winnowing fingerprints of lines of text as a list of (hash, first word index, first line, last line)'''
+    words, lineNumbers = documentWords(lines)
+    hashes = [shingleHash(tuple(words[i:i + k])) for i in range(len(words) - k + 1)]
+    return [(hashes[i], i, lineNumbers[i], lineNumbers[i + k - 1]) for i in winnow(hashes, window)]
+
+def fingerprintFile(file, k, window):
+    '''returns the winnowing fingerprints of an entire file'''
+    with open(file, 'r') as file:
+        return fingerprintLines(file, k, window)
+
+def fingerprintSimilarity(fingerprints1, fingerprints2):
+    '''computes Jacquard's Similarity Index between the fingerprint hashes of two documents'''
+    hashes1 = {fingerprint[0] for fingerprint in fingerprints1}
+    hashes2 = {fingerprint[0] for fingerprint in fingerprints2}
+    union = hashes1 | hashes2
+    return len(hashes1 & hashes2) / len(union) if union else 0
+
+def matchingPassages(fingerprints1, fingerprints2, gap):
+    '''
+    returns the passages two documents share as a list of ((first line, last line) in document 1, (first line, last line) in document 2);
+    matching fingerprints at most gap words apart in both documents are merged into one passage
+    '''
+    positions = {}
+    for fingerprint in fingerprints2:
+        positions.setdefault(fingerprint[0], []).append(fingerprint)
+    matches = sorted(((fingerprint, other) for fingerprint in fingerprints1 for other in positions.get(fingerprint[0], ())), key=lambda match: (match[0][1], match[1][1]))
+    passages = []
+    last = None
+    for fingerprint, other in matches:
+        if last is not None and 0 < fingerprint[1] - last[0][1] <= gap and 0 < other[1] - last[1][1] <= gap:
+            passage = passages[-1]
+            passages[-1] = ((passage[0][0], fingerprint[3]), (passage[1][0], max(passage[1][1], other[3])))
+        else:
+            passages.append(((fingerprint[2], fingerprint[3]), (other[2], other[3])))
+        last = (fingerprint, other)
+    return passages
+
+def describePassages(passages, limit=3):
+    '''returns passages as short text such as "lines 1-4 ~ 2-5", listing at most limit of them'''
+    def lineRange(lines):
+        return str(lines[0]) if lines[0] == lines[1] else "{}-{}".format(lines[0], lines[1])
+    text = ["lines {} ~ {}".format(lineRange(passage[0]), lineRange(passage[1])) for passage in passages[:limit]]
+    if len(passages) > limit:
+        text.append("(+{} more)".format(len(passages) - limit))
+    return "\n".join(text)